@@ -3,20 +3,100 @@ import logging
 from datetime import datetime
 from logging.handlers import TimedRotatingFileHandler
 
-from aiogram import Bot, Dispatcher
+from aiogram import Dispatcher
 from aiogram.types import AllowedUpdates
 from aiogram.utils import executor
-from aiogram.contrib.fsm_storage.redis import RedisStorage2
 from aiogram.utils.exceptions import Unauthorized
 
+from .bot.utils.codec import StateCodec
+from .bot.utils.outbound import ScheduledBot
+from .bot.utils.storage import BufferedRedisStorage
+
 
 async def on_startup(dp: Dispatcher) -> None:
     from .config import Config
     config: Config = dp.bot["config"]
 
+    from redis.asyncio import Redis
+    dp.bot["redis"] = Redis(host=config.redis.HOST,
+                            port=config.redis.PORT,
+                            db=config.redis.DB)
+
     from .bot.utils.coingecko import Coingecko
+    coingecko = Coingecko(dp.bot["redis"])
+    await coingecko.load()
     asyncio.create_task(
-        Coingecko().run_updates()
+        coingecko.run_updates()
+    )
+    dp.bot["coingecko"] = coingecko
+
+    from .bot.utils.history import HISTORY
+    HISTORY.setup(dp.bot["redis"])
+    await HISTORY.load()
+    asyncio.create_task(
+        HISTORY.run_backfill()
+    )
+
+    from .bot.utils.tonapi import TonapiPool
+    tonapi_pool = TonapiPool(config.tonapi.ENCRYPTION_KEY, base_url=config.tonapi.BASE_URL)
+    asyncio.create_task(
+        tonapi_pool.run_eviction()
+    )
+    dp.bot["tonapi_pool"] = tonapi_pool
+
+    # The processes of a replica split its Telegram and TONAPI budgets.
+    bot_rps = config.bot.RPS / config.processes
+    tonapi_rps = config.tonapi.RPS / config.processes
+
+    from .bot.utils.outbound import OutboundScheduler
+    outbound = OutboundScheduler(bot_rps, max(1, int(bot_rps)), chat_rate=config.bot.CHAT_RPS)
+    outbound.start()
+    dp.bot["outbound"] = outbound
+
+    from .bot.utils.scheduler import TonapiScheduler
+    tonapi_scheduler = TonapiScheduler(tonapi_rps, max(1, config.tonapi.BURST // config.processes))
+    tonapi_scheduler.start()
+    dp.bot["tonapi_scheduler"] = tonapi_scheduler
+
+    from .bot.utils.adaptive import AIMDLimiter, CircuitBreaker
+    dp.bot["tonapi_limiter"] = AIMDLimiter(maximum=max(1, int(tonapi_rps * 4)))
+    dp.bot["tonapi_breaker"] = CircuitBreaker()
+
+    from .bot.utils.requeue import DeferredLookups
+    dp.bot["deferred_lookups"] = DeferredLookups(dp.bot["tonapi_breaker"])
+
+    from .bot.utils.cache import ResponseCache
+    dp.bot["tonapi_cache"] = ResponseCache(dp.bot["redis"])
+
+    from .bot.utils.singleflight import SingleFlight
+    dp.bot["tonapi_singleflight"] = SingleFlight()
+
+    from .bot.utils.resolver import ContractResolver
+    dp.bot["contract_resolver"] = ContractResolver(dp.bot["redis"])
+
+    from .bot.utils.balances import JettonBalanceCache
+    dp.bot["jetton_balances"] = JettonBalanceCache()
+
+    from .bot.utils.holders import JettonHoldersCache
+    dp.bot["jetton_holders"] = JettonHoldersCache()
+
+    from .bot.utils.pages import EventPageStore
+    dp.bot["event_pages"] = EventPageStore(dp.bot["redis"])
+
+    from .bot.utils.nfts import NftCache
+    dp.bot["nft_cache"] = NftCache()
+
+    from .bot.utils.busy import BusyUsers
+    dp.bot["busy_users"] = BusyUsers(dp.bot["redis"])
+    asyncio.create_task(
+        dp.bot["busy_users"].run()
+    )
+
+    from .bot.utils.dns import DNS
+    DNS.setup(dp.bot["redis"], config.tonapi.DNS_TTL)
+
+    asyncio.create_task(
+        dp.storage.run_compaction(config.redis.FSM_COMPACTION_INTERVAL)
     )
 
     from .db.database import Database
@@ -40,6 +120,11 @@ async def on_startup(dp: Dispatcher) -> None:
     handlers.callbacks.register(dp)
     handlers.inlines.register(dp)
 
+    from functools import partial
+    asyncio.create_task(
+        dp.bot["deferred_lookups"].run(partial(handlers.messages.replay_lookup, dp))
+    )
+
 
 async def on_shutdown(dp: Dispatcher) -> None:
     from .bot.handlers import commands
@@ -50,15 +135,175 @@ async def on_shutdown(dp: Dispatcher) -> None:
     await db.close()
     logging.warning("Database closed.")
 
+    from .bot.utils.scheduler import TonapiScheduler
+    tonapi_scheduler: TonapiScheduler = dp.bot["tonapi_scheduler"]
+    await tonapi_scheduler.close()
+
+    from .bot.utils.tonapi import TonapiPool
+    tonapi_pool: TonapiPool = dp.bot["tonapi_pool"]
+    logging.info(f"TONAPI client pool stats: {tonapi_pool.stats}")
+    await tonapi_pool.close()
+
+    logging.info(f"TONAPI response cache stats: {dp.bot['tonapi_cache'].stats}")
+    logging.info(f"TONAPI concurrency limiter stats: {dp.bot['tonapi_limiter'].stats}")
+    logging.info(f"TONAPI circuit breaker stats: {dp.bot['tonapi_breaker'].stats}")
+    logging.info(f"Deferred lookups stats: {dp.bot['deferred_lookups'].stats}")
+    logging.info(f"Contract resolver stats: {dp.bot['contract_resolver'].stats}")
+    logging.info(f"Jetton balance snapshot stats: {dp.bot['jetton_balances'].stats}")
+    logging.info(f"Jetton holders index stats: {dp.bot['jetton_holders'].stats}")
+    logging.info(f"NFT cache stats: {dp.bot['nft_cache'].stats}")
+    from .bot.utils.dns import DNS
+    logging.info(f"DNS cache stats: {DNS.stats}")
+    logging.info(f"TONAPI single-flight stats: {dp.bot['tonapi_singleflight'].stats}")
+
+    from .bot.utils.coingecko import Coingecko
+    coingecko: Coingecko = dp.bot["coingecko"]
+    await coingecko.close()
+
+    from redis.asyncio import Redis
+    redis: Redis = dp.bot["redis"]
+    await redis.close()
+    logging.warning("Redis connection closed.")
+
+    logging.info(f"Dispatcher storage stats: {dp.storage.stats}")
+    from .bot.utils.models import MODELS
+    logging.info(f"View model cache stats: {MODELS.stats}")
+    logging.info(f"Busy users stats: {dp.bot['busy_users'].stats}")
+    from .bot.middlewares.throttling import PROGRESS
+    logging.info(f"Progress indication stats: {PROGRESS.stats}")
+    from .bot.utils.message import RENDERED
+    logging.info(f"Rendered digests stats: {RENDERED.stats}")
     await dp.storage.close()
     await dp.storage.wait_closed()
     logging.warning("Dispatcher storage closed.")
 
+    from .bot.utils.outbound import OutboundScheduler
+    outbound: OutboundScheduler = dp.bot["outbound"]
+    logging.info(f"Outbound scheduler stats: {outbound.stats}")
+    await outbound.close()
+    dp.bot["outbound"] = None
+
     session = await dp.bot.get_session()
     await session.close()
     logging.warning("Bot session closed.")
 
 
+def create_dispatcher(config) -> Dispatcher:
+    bot = ScheduledBot(token=config.bot.TOKEN, parse_mode="HTML")
+    storage = BufferedRedisStorage(host=config.redis.HOST,
+                                   port=config.redis.PORT,
+                                   db=config.redis.DB,
+                                   codec=StateCodec(config.redis.FSM_CODEC,
+                                                    config.redis.FSM_ZLIB_THRESHOLD),
+                                   session_ttl=config.redis.FSM_SESSION_TTL or None,
+                                   data_ttl=config.redis.FSM_DATA_TTL or None,
+                                   state_ttl=config.redis.FSM_STATE_TTL or None,
+                                   bucket_ttl=config.redis.FSM_BUCKET_TTL or None)
+    dp = Dispatcher(bot=bot, storage=storage)
+    bot["config"] = config
+    return dp
+
+
+def create_front(config) -> Dispatcher:
+    from multiprocessing import Process, Queue
+    from .bot.sharding import ShardedDispatcher
+
+    queues = [Queue() for _ in range(config.bot.SHARDS)]
+    shards = [
+        Process(target=run_shard, args=(config, shard, queue), name=f"shard-{shard}")
+        for shard, queue in enumerate(queues)
+    ]
+    for process in shards:
+        process.start()
+
+    bot = ScheduledBot(token=config.bot.TOKEN, parse_mode="HTML")
+    dp = ShardedDispatcher(bot, queues)
+    bot["config"] = config
+    bot["shards"] = shards
+    return dp
+
+
+async def on_startup_front(dp: Dispatcher) -> None:
+    dp.bot["shards_report"] = asyncio.create_task(dp.report())
+    logging.info(f"Fanning updates out to {len(dp.queues)} shards.")
+
+
+async def on_shutdown_front(dp: Dispatcher) -> None:
+    dp.bot["shards_report"].cancel()
+    for queue in dp.queues:
+        queue.put(None)
+    loop = asyncio.get_running_loop()
+    for process in dp.bot["shards"]:
+        await loop.run_in_executor(None, process.join)
+    logging.warning("Shards stopped.")
+
+    session = await dp.bot.get_session()
+    await session.close()
+
+
+def run_shard(config, shard: int, queue) -> None:
+    import signal
+    from .bot.sharding import ShardWorker
+
+    # The front process stops the workers once it has stopped receiving updates.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async def main() -> None:
+        dp = create_dispatcher(config)
+        worker = ShardWorker(dp, queue, shard)
+        await on_startup(dp)
+        report = asyncio.create_task(worker.report())
+        try:
+            await worker.run()
+        finally:
+            report.cancel()
+            logging.info(f"Shard {shard} stats: {worker.stats}")
+            await on_shutdown(dp)
+
+    asyncio.run(main())
+
+
+def run(config, worker: int = 0) -> None:
+    if config.bot.SHARDS > 1:
+        dp = create_front(config)
+    else:
+        dp = create_dispatcher(config)
+
+    try:
+        if config.webhook.ENABLED:
+            from aiohttp import web
+            from .bot.webhook import create_app
+
+            if config.bot.SHARDS > 1:
+                app = create_app(dp, config.webhook, on_startup_front, on_shutdown_front)
+            else:
+                app = create_app(dp, config.webhook, on_startup, on_shutdown, primary=worker == 0)
+            web.run_app(
+                app,
+                host=config.webhook.HOST,
+                port=config.webhook.PORT,
+                # Workers share the port, the kernel balances connections between them.
+                reuse_port=config.webhook.WORKERS > 1,
+                print=None,
+            )
+        else:
+            sharded = config.bot.SHARDS > 1
+            executor.start_polling(
+                dispatcher=dp,
+                skip_updates=False,
+                reset_webhook=True,
+                on_startup=on_startup_front if sharded else on_startup,
+                on_shutdown=on_shutdown_front if sharded else on_shutdown,
+                allowed_updates=AllowedUpdates.all()
+            )
+
+    except Unauthorized:
+        logging.error("Invalid bot token!")
+
+    except Exception as e:
+        logging.error(e)
+
+
 def init():
     import logging
     logging.basicConfig(
@@ -78,28 +323,20 @@ def init():
     from .config import load_config
     config = load_config()
 
-    bot = Bot(token=config.bot.TOKEN, parse_mode="HTML")
-    storage = RedisStorage2(host=config.redis.HOST,
-                            port=config.redis.PORT,
-                            db=config.redis.DB)
-    dp = Dispatcher(bot=bot, storage=storage)
-    bot["config"] = config
-
-    try:
-        executor.start_polling(
-            dispatcher=dp,
-            skip_updates=False,
-            reset_webhook=True,
-            on_startup=on_startup,
-            on_shutdown=on_shutdown,
-            allowed_updates=AllowedUpdates.all()
-        )
-
-    except Unauthorized:
-        logging.error("Invalid bot token!")
+    # Sharding runs a single front process that fans updates out to its own workers.
+    if not config.webhook.ENABLED or config.webhook.WORKERS <= 1 or config.bot.SHARDS > 1:
+        run(config)
+        return
 
-    except Exception as e:
-        logging.error(e)
+    from multiprocessing import Process
+    workers = [
+        Process(target=run, args=(config, worker), name=f"worker-{worker}")
+        for worker in range(config.webhook.WORKERS)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
 
 
 if __name__ == "__main__":
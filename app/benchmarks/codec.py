@@ -0,0 +1,129 @@
+"""
+Compare FSM data codecs on the state shapes the bot stores.
+
+Shapes are built from the TONAPI stub fixtures when they are recorded
+(see ``python -m app.stub --record``), otherwise from synthetic data:
+    python -m app.benchmarks.codec
+    python -m app.benchmarks.codec --fixtures app/stub/fixtures --repeat 500
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from app.bot.utils.codec import StateCodec
+
+FIXTURES = Path(__file__).resolve().parent.parent / "stub" / "fixtures"
+ADDRESS = "0:" + "ab" * 32
+
+
+def synthetic_account() -> dict:
+    return {
+        "address": ADDRESS, "balance": 123_456_789_000, "last_activity": 1_700_000_000,
+        "status": "active", "interfaces": ["wallet_v4r2"], "name": None,
+        "is_scam": False, "icon": None, "memo_required": False, "get_methods": ["seqno", "get_public_key"],
+    }
+
+
+def synthetic_event(i: int) -> dict:
+    return {
+        "event_id": f"{random.getrandbits(256):064x}",
+        "account": {"address": ADDRESS, "name": None, "is_scam": False, "icon": None},
+        "timestamp": 1_700_000_000 - i * 60, "lt": 40_000_000_000_000 - i * 1000,
+        "is_scam": False, "in_progress": False, "extra": -5_000_000,
+        "actions": [{
+            "type": "TonTransfer", "status": "ok",
+            "TonTransfer": {
+                "sender": {"address": ADDRESS, "name": None, "is_scam": False, "icon": None},
+                "recipient": {"address": "0:" + "cd" * 32, "name": "Wallet", "is_scam": False, "icon": None},
+                "amount": random.randint(1, 10 ** 12), "comment": "payment", "encrypted_comment": None,
+                "refund": None,
+            },
+            "simple_preview": {
+                "name": "Ton Transfer", "description": "Transferring 1.5 TON", "action_image": None,
+                "value": "1.5 TON", "value_image": None,
+                "accounts": [{"address": ADDRESS, "name": None, "is_scam": False, "icon": None}],
+            },
+        }],
+    }
+
+
+def load_fixture(path: Path | None, name: str) -> dict | None:
+    if path is None or not (path / f"{name}.json").exists():
+        return None
+    return json.loads((path / f"{name}.json").read_text())["body"]
+
+
+def shapes(fixtures: Path | None) -> dict[str, dict]:
+    account = load_fixture(fixtures, "accounts_info") or synthetic_account()
+    events = load_fixture(fixtures, "accounts_events") or {
+        "events": [synthetic_event(i) for i in range(10)], "next_from": 0,
+    }
+    event = events["events"][0] if events["events"] else synthetic_event(0)
+    jetton = load_fixture(fixtures, "jettons_info")
+
+    session = {"message_id": 1234, "testnet": False, "tonapi_key": "gAAAAA" + "x" * 180}
+    result = {
+        "session": session,
+        "account": {**session, "contract_type": "account", "account": account},
+        "event": {**session, "from_pages": True, "event": event},
+        # The events blob as it grew before pages were moved out of the FSM: 50 pages of 10 events.
+        "events x50": {**session, "account": account, "page": 50,
+                       "events": {"events": [synthetic_event(i) for i in range(500)], "next_from": 0}},
+    }
+    if jetton:
+        result["jetton"] = {**session, "contract_type": "jetton", "account": account, "jetton": jetton}
+    return result
+
+
+def measure(codec, data: dict, repeat: int) -> tuple[int, float, float]:
+    raw = codec.encode(data)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        codec.encode(data)
+    encode = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        codec.decode(raw)
+    decode = (time.perf_counter() - start) / repeat
+    return len(raw), encode, decode
+
+
+class LegacyCodec:
+    """What RedisStorage2 stores: ``json.dumps`` of the data."""
+
+    @staticmethod
+    def encode(data: dict) -> bytes:
+        return json.dumps(data).encode()
+
+    @staticmethod
+    def decode(raw: bytes) -> dict:
+        return json.loads(raw)
+
+
+def init():
+    parser = argparse.ArgumentParser(prog="python -m app.benchmarks.codec")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--threshold", type=int, default=1024)
+    args = parser.parse_args()
+
+    codecs = {"legacy json": LegacyCodec()}
+    for name in StateCodec.FORMATS:
+        try:
+            codecs[name] = StateCodec(name, threshold=None)
+            codecs[f"{name}+zlib"] = StateCodec(name, threshold=args.threshold)
+        except RuntimeError:
+            pass
+
+    print(f"{'shape':<12} {'codec':<14} {'bytes':>9} {'encode, us':>11} {'decode, us':>11}")
+    for shape, data in shapes(args.fixtures).items():
+        for name, codec in codecs.items():
+            size, encode, decode = measure(codec, data, args.repeat)
+            print(f"{shape:<12} {name:<14} {size:>9} {encode * 1e6:>11.1f} {decode * 1e6:>11.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    init()
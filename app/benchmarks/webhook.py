@@ -0,0 +1,74 @@
+"""
+Push synthetic updates to a running webhook, the way Telegram does.
+
+Start the bot with WEBHOOK=true, then:
+    python -m app.benchmarks.webhook --secret <WEBHOOK_SECRET>
+    python -m app.benchmarks.webhook --updates 5000 --concurrency 200 --users 50
+
+Reports the response statuses (503 means the intake bound was hit) and the response latency.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+from aiohttp import ClientSession
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def synthetic_update(update_id: int, user_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {**user, "type": "private"},
+            "from": user,
+            "text": "/help",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+        },
+    }
+
+
+async def push(url: str, secret: str | None, updates: int, concurrency: int, users: int) -> None:
+    statuses, latencies = Counter(), []
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {SECRET_HEADER: secret} if secret else {}
+
+    async with ClientSession() as session:
+        async def post(update_id: int) -> None:
+            update = synthetic_update(update_id, random.randint(1, users))
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(url, json=update, headers=headers) as response:
+                    statuses[response.status] += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(1, updates + 1)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{updates} updates in {elapsed:.2f}s ({updates / elapsed:.0f}/s)")
+    print("statuses:", dict(statuses))
+    for p in (50, 95, 99):
+        print(f"p{p}: {latencies[int(len(latencies) * p / 100) - 1] * 1000:.1f} ms")
+
+
+def init():
+    parser = argparse.ArgumentParser(prog="python -m app.benchmarks.webhook")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("--secret", default=None)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=40, help="Telegram uses up to max_connections.")
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(push(args.url, args.secret, args.updates, args.concurrency, args.users))
+
+
+if __name__ == "__main__":
+    init()
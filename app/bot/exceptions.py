@@ -1,5 +1,20 @@
 from aiogram.utils.exceptions import BadRequest
+from pytonapi.exceptions import TONAPINotFoundError, TONAPITooManyRequestsError
 
 
 class BadRequestMessageIsTooLong(BadRequest):
     match = "Message_too_long"
+
+
+class TONAPICachedNotFoundError(TONAPINotFoundError):
+    """Raised when a "not found" answer is served from the response cache."""
+
+    def __init__(self, endpoint: str) -> None:
+        Exception.__init__(self, f"Not found (cached): {endpoint}")
+
+
+class TONAPICircuitOpenError(TONAPITooManyRequestsError):
+    """Raised when a request with the shared key is shed by the circuit breaker."""
+
+    def __init__(self, priority: str) -> None:
+        Exception.__init__(self, f"Rate limit circuit is open: {priority} request shed")
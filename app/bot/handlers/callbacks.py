@@ -6,7 +6,6 @@ from aiogram import Dispatcher
 from aiogram.dispatcher import FSMContext
 from aiogram.types import CallbackQuery
 from aiogram.utils.exceptions import MessageIsTooLong
-from pytonapi import AsyncTonapi
 from pytonapi.schema.accounts import Account
 from pytonapi.schema.events import AccountEvents
 
@@ -14,13 +13,16 @@ from app.bot.filters import IsPrivate
 from app.bot.handlers import windows
 from app.bot.keyboards import callback_data, inline
 from app.bot.keyboards.inline import InlineKeyboardCalendar
-from app.bot.middlewares.throttling import ThrottlingContext, EMOJIS_MAGNIFIER, rate_limit
+from app.bot.middlewares.throttling import ThrottlingContext, EMOJIS_MAGNIFIER, Progress, rate_limit
 from app.bot.states import State
 from app.bot.texts import messages, buttons
 from app.bot.exceptions import BadRequestMessageIsTooLong
-from app.bot.utils.coingecko import Coingecko
 from app.bot.utils.export import ExportManager
+from app.bot.utils.history import HISTORY
 from app.bot.utils.message import edit_or_send_message, delete_previous_message
+from app.bot.utils.models import MODELS
+from app.bot.utils.pages import EventPageStore
+from app.bot.utils.tonapi import TonapiClient
 
 
 @rate_limit(1)
@@ -71,7 +73,7 @@ async def set_api_key(call: CallbackQuery, state: FSMContext, chat_id, message_i
 
 
 @rate_limit(1)
-async def contract(call: CallbackQuery, state: FSMContext, tonapi: AsyncTonapi, chat_id, message_id) -> None:
+async def contract(call: CallbackQuery, state: FSMContext, tonapi: TonapiClient, chat_id, message_id) -> None:
     data = await state.get_data()
 
     match call.data:
@@ -84,16 +86,20 @@ async def contract(call: CallbackQuery, state: FSMContext, tonapi: AsyncTonapi,
             async with ThrottlingContext(bot=call.bot, state=state,
                                          chat_id=chat_id, message_id=message_id,
                                          emojis=EMOJIS_MAGNIFIER):
-                account: Account = Account(**data["account"])
-                events = await tonapi.accounts.get_events(
-                    account_id=account.address.to_userfriendly(), limit=10,
-                )
-                await state.update_data(
-                    page=1, total_pages=1, events=events.dict()
-                )
+                account: Account = MODELS.load(data, "account", Account)
+                account_id = account.address.to_userfriendly()
+                pages: EventPageStore = call.bot.get("event_pages")
+                rows = await pages.fetch(tonapi, chat_id, account_id, refresh=True)
+                cursors = [0]
+                if cursor := await pages.probe(tonapi, chat_id, account_id, rows):
+                    cursors.append(cursor)
+                async with state.proxy() as proxy:
+                    proxy.pop("events", None)
+                    proxy.pop("total_pages", None)
+                    proxy.update(page=1, cursors=cursors)
 
             await windows.events_page(
-                bot=call.bot, state=state,
+                bot=call.bot, state=state, tonapi=tonapi,
                 chat_id=chat_id, message_id=message_id,
             )
         case callback_data.attributes:
@@ -123,12 +129,12 @@ async def contract(call: CallbackQuery, state: FSMContext, tonapi: AsyncTonapi,
 
 
 @rate_limit(0.5)
-async def details(call: CallbackQuery, state: FSMContext, tonapi: AsyncTonapi, chat_id, message_id) -> None:
+async def details(call: CallbackQuery, state: FSMContext, tonapi: TonapiClient, chat_id, message_id) -> None:
     data = await state.get_data()
 
     match call.data:
         case callback_data.back:
-            await state.update_data(page=1, total_pages=1)
+            await state.update_data(page=1)
 
             match data["contract_type"]:
                 case "jetton":
@@ -170,7 +176,7 @@ async def details(call: CallbackQuery, state: FSMContext, tonapi: AsyncTonapi, c
                                          chat_id=chat_id, message_id=message_id,
                                          emojis=EMOJIS_MAGNIFIER):
                 event = await tonapi.events.get_event(event_id=event_id)
-                await state.update_data(from_pages=True, event=event.dict())
+                await state.update_data(from_pages=True, **MODELS.dump(event=event))
                 await windows.information_event(
                     bot=call.bot, state=state,
                     chat_id=chat_id, message_id=message_id,
@@ -178,33 +184,33 @@ async def details(call: CallbackQuery, state: FSMContext, tonapi: AsyncTonapi, c
 
         case page if call.data.startswith("page"):
 
-            account: Account = Account(**data["account"])
-            events: AccountEvents = AccountEvents(**data["events"])
+            account: Account = MODELS.load(data, "account", Account)
+            account_id = account.address.to_userfriendly()
+            pages: EventPageStore = call.bot.get("event_pages")
 
             page = int(page.split(":")[1])
             current_page = data.get("page", 1)
-            total_pages = int((len(events.events)) / 10)
+            cursors: list[int] = data.get("cursors", [0])
 
             if page == current_page:
                 await call.answer()
                 return
 
-            if page > total_pages:
+            if page > len(cursors):
+                await call.answer()
+                return
+
+            if page == len(cursors):
                 async with ThrottlingContext(bot=call.bot, state=state,
                                              chat_id=chat_id, message_id=message_id,
                                              emojis=EMOJIS_MAGNIFIER):
-                    search: AccountEvents = await tonapi.accounts.get_events(
-                        account_id=account.address.to_userfriendly(),
-                        limit=10, before_lt=events.events[-1].lt,
-                    )
-                    events.events += search.events
-                    total_pages += 1
+                    rows = await pages.fetch(tonapi, chat_id, account_id, cursors[-1])
+                    if cursor := await pages.probe(tonapi, chat_id, account_id, rows):
+                        cursors.append(cursor)
 
-            await state.update_data(
-                page=page, total_pages=total_pages, events=events.dict()
-            )
+            await state.update_data(page=page, cursors=cursors)
             await windows.events_page(
-                bot=call.bot, state=state,
+                bot=call.bot, state=state, tonapi=tonapi,
                 chat_id=chat_id, message_id=message_id,
             )
 
@@ -212,7 +218,7 @@ async def details(call: CallbackQuery, state: FSMContext, tonapi: AsyncTonapi, c
 
 
 @rate_limit(1)
-async def information_event(call: CallbackQuery, state: FSMContext, chat_id, message_id) -> None:
+async def information_event(call: CallbackQuery, state: FSMContext, tonapi: TonapiClient, chat_id, message_id) -> None:
     data = await state.get_data()
 
     match call.data:
@@ -220,7 +226,7 @@ async def information_event(call: CallbackQuery, state: FSMContext, chat_id, mes
             from_pages = data.get("from_pages", False)
             if from_pages:
                 await windows.events_page(
-                    bot=call.bot, state=state,
+                    bot=call.bot, state=state, tonapi=tonapi,
                     chat_id=chat_id, message_id=message_id,
                 )
             else:
@@ -254,7 +260,7 @@ async def information_event_json(call: CallbackQuery, state: FSMContext, chat_id
 
 
 @rate_limit(0.5)
-async def select_date(call: CallbackQuery, state: FSMContext, chat_id, message_id) -> None:
+async def select_date(call: CallbackQuery, state: FSMContext, tonapi: TonapiClient, chat_id, message_id) -> None:
     data = await state.get_data()
 
     current_date = datetime.datetime.now()
@@ -271,7 +277,7 @@ async def select_date(call: CallbackQuery, state: FSMContext, chat_id, message_i
         case InlineKeyboardCalendar.cb_back:
             await state.update_data(start_date=None, end_date=None)
             await windows.events_page(
-                bot=call.bot, state=state,
+                bot=call.bot, state=state, tonapi=tonapi,
                 chat_id=chat_id, message_id=message_id,
             )
 
@@ -371,7 +377,7 @@ async def select_date(call: CallbackQuery, state: FSMContext, chat_id, message_i
 
 
 @rate_limit(1)
-async def confirm_export(call: CallbackQuery, state: FSMContext, tonapi: AsyncTonapi, chat_id, message_id) -> None:
+async def confirm_export(call: CallbackQuery, state: FSMContext, tonapi: TonapiClient, chat_id, message_id) -> None:
     data = await state.get_data()
 
     match call.data:
@@ -390,27 +396,29 @@ async def confirm_export(call: CallbackQuery, state: FSMContext, tonapi: AsyncTo
             try:
                 async with ThrottlingContext(bot=call.bot, state=state,
                                              chat_id=chat_id, message_id=message_id,
-                                             emojis=EMOJIS_MAGNIFIER):
-                    account: Account = Account(**data["account"])
+                                             emojis=EMOJIS_MAGNIFIER, interval=10,
+                                             mode=Progress.MILESTONES) as throttling:
+                    account: Account = MODELS.load(data, "account", Account)
 
                     start_date = data.get("start_date", None)
                     end_date = data.get("end_date", None)
                     all_time = data.get("all_time", None)
 
                     next_from, amount_received, amount_sent = None, 0, 0
+                    amount_received_usd, amount_sent_usd = 0, 0
                     start_export_date = datetime.datetime.now()
                     events = AccountEvents(events=[], next_from=0)
 
                     while True:
                         if not all_time:
-                            search = await tonapi.accounts.get_events(
+                            search = await tonapi.bulk().accounts.get_events(
                                 account_id=account.address.to_userfriendly(),
                                 start_date=int(str(start_date).split(".")[0]),
                                 end_date=int(str(end_date).split(".")[0]),
                                 before_lt=next_from, limit=1000,
                             )
                         else:
-                            search = await tonapi.accounts.get_events(
+                            search = await tonapi.bulk().accounts.get_events(
                                 account_id=account.address.to_userfriendly(),
                                 before_lt=next_from, limit=1000,
                             )
@@ -420,17 +428,21 @@ async def confirm_export(call: CallbackQuery, state: FSMContext, tonapi: AsyncTo
                         for event in search.events:
                             if event.actions[0].TonTransfer:
                                 amount = float(event.actions[0].simple_preview.value.split(" ")[0].replace(",", ""))
+                                price = HISTORY.price_at(event.timestamp)
                                 if event.actions[0].TonTransfer.sender.address.to_userfriendly() == \
                                         account.address.to_userfriendly():
                                     amount_sent += amount
+                                    amount_sent_usd += amount * price
                                 else:
                                     amount_received += amount
+                                    amount_received_usd += amount * price
 
                         next_from = search.next_from
                         events.events += search.events
+                        throttling.progress(messages.export_progress.format(total_rows=f"{len(events.events):,}"))
                         await asyncio.sleep(1)
 
-                    export_manager = ExportManager(events)
+                    export_manager = ExportManager(events, HISTORY)
                     if data["export_type"] == callback_data.export_as_json:
                         document = await export_manager.save_as_json()
                     else:
@@ -439,7 +451,6 @@ async def confirm_export(call: CallbackQuery, state: FSMContext, tonapi: AsyncTo
                     end_export_date = datetime.datetime.now()
                     time_spent_seconds = (end_export_date - start_export_date).total_seconds()
                     time_spent = str(datetime.timedelta(seconds=time_spent_seconds)).split(".")[0]
-                    price = (await Coingecko().get()).ton.usd
 
                     if not all_time:
                         caption = messages.export_completed.format(
@@ -449,8 +460,8 @@ async def confirm_export(call: CallbackQuery, state: FSMContext, tonapi: AsyncTo
                             export_type=getattr(buttons, data["export_type"]).split(" ")[3],
                             total_rows=len(events.events),
                             time_spent=time_spent,
-                            amount_sent=f"{amount_sent:,.2f} TON\n≈ ${(amount_sent * price):,.2f}",
-                            amount_received=f"{amount_received:,.2f} TON\n≈ ${(amount_received * price):,.2f}",
+                            amount_sent=f"{amount_sent:,.2f} TON\n≈ ${amount_sent_usd:,.2f}",
+                            amount_received=f"{amount_received:,.2f} TON\n≈ ${amount_received_usd:,.2f}",
                         )
                     else:
                         caption = messages.confirm_export_all_time_completed.format(
@@ -459,8 +470,8 @@ async def confirm_export(call: CallbackQuery, state: FSMContext, tonapi: AsyncTo
                             export_type=getattr(buttons, data["export_type"]),
                             total_rows=len(events.events),
                             time_spent=time_spent,
-                            amount_sent=f"{amount_sent:,.2f} TON\n≈ ${(amount_sent * price):,.2f}",
-                            amount_received=f"{amount_received:,.2f} TON\n≈ ${(amount_received * price):,.2f}",
+                            amount_sent=f"{amount_sent:,.2f} TON\n≈ ${amount_sent_usd:,.2f}",
+                            amount_received=f"{amount_received:,.2f} TON\n≈ ${amount_received_usd:,.2f}",
                         )
 
                 await call.message.answer_document(document=document, caption=caption)
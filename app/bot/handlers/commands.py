@@ -4,13 +4,16 @@ from aiogram import Dispatcher
 from aiogram.dispatcher import FSMContext
 from aiogram.types import (Message, BotCommand,
                            BotCommandScopeAllPrivateChats)
+from aiogram.utils.markdown import hcode
 
 from app.bot.filters import IsPrivate
 from app.bot.handlers import windows
 from app.bot.keyboards import inline
-from app.bot.middlewares.throttling import rate_limit
+from app.bot.middlewares.throttling import PROGRESS, rate_limit
 from app.bot.states import State
 from app.bot.texts import messages
+from app.bot.utils.busy import BusyUsers
+from app.bot.utils.memory import memory_report
 from app.bot.utils.message import (edit_or_send_message,
                                    delete_previous_message, delete_message)
 from app.db.database import Database
@@ -77,7 +80,29 @@ async def switch_network(message: Message, state: FSMContext, chat_id: int, mess
     await delete_message(message)
 
 
+async def memory(message: Message) -> None:
+    report = await memory_report(message.bot["redis"])
+    lines = [f"{'category':<14} {'keys':>8} {'KB':>9} {'no ttl':>7}"]
+    for name, usage in report.items():
+        lines.append(f"{name:<14} {usage.keys:>8} {usage.bytes / 1024:>9.1f} {usage.persistent:>7}")
+    lines.append(f"{'total':<14} {sum(u.keys for u in report.values()):>8} "
+                 f"{sum(u.bytes for u in report.values()) / 1024:>9.1f} "
+                 f"{sum(u.persistent for u in report.values()):>7}")
+    await message.answer(hcode("\n".join(lines)))
+
+
+async def busy(message: Message) -> None:
+    busy_users: BusyUsers = message.bot["busy_users"]
+    lines = [f"{'busy, all replicas':<20} {await busy_users.count():>8}"]
+    lines += [f"{name:<20} {value:>8}" for name, value in busy_users.stats.items()]
+    lines += [f"{name:<20} {value:>8}" for name, value in PROGRESS.stats.items()]
+    await message.answer(hcode("\n".join(lines)))
+
+
 def register(dp: Dispatcher) -> None:
+    from app.config import Config
+    config: Config = dp.bot["config"]
+
     dp.register_message_handler(
         start, IsPrivate(),
         commands="start", state="*",
@@ -94,6 +119,16 @@ def register(dp: Dispatcher) -> None:
         switch_network, IsPrivate(),
         commands="switch_network", state="*",
     )
+    dp.register_message_handler(
+        memory, IsPrivate(),
+        commands="memory", state="*",
+        user_id=config.bot.DEV_ID,
+    )
+    dp.register_message_handler(
+        busy, IsPrivate(),
+        commands="busy", state="*",
+        user_id=config.bot.DEV_ID,
+    )
 
 
 async def setup(dp: Dispatcher) -> None:
@@ -2,16 +2,20 @@ import logging
 
 from aiogram import Dispatcher
 from aiogram.types import InlineQuery
-from aiogram.utils.parts import paginate
-from pytonapi import AsyncTonapi
 from pytonapi.exceptions import TONAPIUnauthorizedError, TONAPITooManyRequestsError
 
 from app.bot.keyboards import inline
 from app.bot.texts import articles, messages
 from app.bot.texts.articles import create_contract_article
+from app.bot.utils.balances import JettonBalanceCache
+from app.bot.utils.dns import DNS, is_domain
+from app.bot.utils.holders import JettonHoldersCache
+from app.bot.utils.nfts import NftCache
+from app.bot.utils.resolver import ContractResolver
+from app.bot.utils.tonapi import TonapiClient
 
 
-async def inline_query_handler(inline_query: InlineQuery, tonapi: AsyncTonapi):
+async def inline_query_handler(inline_query: InlineQuery, tonapi: TonapiClient):
     try:
         match inline_query.query:
             case query if query.startswith("events"):
@@ -21,17 +25,8 @@ async def inline_query_handler(inline_query: InlineQuery, tonapi: AsyncTonapi):
                 items = await tonapi.accounts.get_events(
                     account_id=account_id, before_lt=offset, limit=50,
                 )
-                nft_addresses = {
-                    event.event_id: event.actions[0].NftItemTransfer.nft
-                    for event in items.events if event.actions[0].NftItemTransfer
-                }
-                if any(nft_addresses):
-                    search = await tonapi.nft.get_bulk_items(list(nft_addresses.values()))
-                    [
-                        event.actions[0].NftItemTransfer.__setattr__('nft', nft) for event in items.events if
-                        event.actions[0].NftItemTransfer and (nft_address := nft_addresses.get(event.event_id))
-                        for nft in search.nft_items if nft.address.to_raw() == nft_address
-                    ]
+                nfts: NftCache = inline_query.bot.get("nft_cache")
+                await nfts.enrich(tonapi, items.events)
 
                 results = [articles.create_event_article(item) for item in items.events]
                 if results:
@@ -59,8 +54,8 @@ async def inline_query_handler(inline_query: InlineQuery, tonapi: AsyncTonapi):
                 offset = int(inline_query.offset) if inline_query.offset else 0
                 account_id = query.split(" ")[1]
 
-                items = await tonapi.accounts.get_jettons_balances(account_id=account_id)
-                items = paginate(items.balances, int(offset), 50)
+                balances: JettonBalanceCache = inline_query.bot.get("jetton_balances")
+                items = await balances.page(tonapi, account_id, offset)
 
                 results = [articles.create_token(item) for item in items]
                 results = [article for article in results if article]
@@ -90,11 +85,10 @@ async def inline_query_handler(inline_query: InlineQuery, tonapi: AsyncTonapi):
                 offset = int(inline_query.offset) if inline_query.offset else 0
                 account_id = query.split(" ")[1]
 
-                jetton = await tonapi.jettons.get_info(account_id=account_id)
-                items = await tonapi.jettons.get_holders(account_id=account_id)
-                items = paginate(items.addresses, offset, 50)
+                holders: JettonHoldersCache = inline_query.bot.get("jetton_holders")
+                index = await holders.get(tonapi, account_id, offset)
 
-                results = [articles.create_holders(jetton, item) for item in items]
+                results = [articles.create_holders(index.jetton, item) for item in index.page(offset, 50)]
                 if results:
                     next_offset = str(offset + 50)
                     await inline_query.answer(
@@ -112,12 +106,11 @@ async def inline_query_handler(inline_query: InlineQuery, tonapi: AsyncTonapi):
     await inline_query.answer([], cache_time=1, is_personal=True)
 
 
-async def contract_inline_query(inline_query: InlineQuery, tonapi: AsyncTonapi):
+async def contract_inline_query(inline_query: InlineQuery, tonapi: TonapiClient):
     try:
         domain = inline_query.query
-        if domain[-4:] == ".ton" or domain[-5:] == ".t.me":
-            request = await tonapi.dns.resolve(domain.lower())
-            account_id = request.wallet.address.to_userfriendly()
+        if is_domain(domain):
+            account_id = await DNS.resolve(tonapi, domain)
         else:
             address = inline_query.query
             if len(address) == 48 or len(address) == 66:
@@ -126,50 +119,31 @@ async def contract_inline_query(inline_query: InlineQuery, tonapi: AsyncTonapi):
                 account_id = None
 
         if account_id:
-            account = await tonapi.accounts.get_info(account_id)
+            resolver: ContractResolver = inline_query.bot.get("contract_resolver")
+            contract = await resolver.resolve(tonapi, account_id)
+            account = contract.account
 
-            if account.interfaces is None:
-                chl = f"ton://transfer/{account.address.to_userfriendly()}"
-                preview_url = f"https://chart.googleapis.com/chart?chs=512x512&cht=qr&chl={chl}"
-                message_text = await messages.information(account, preview_url)
-                reply_markup = inline.information(account.address.to_userfriendly(), True)
-                return create_contract_article(account, message_text, reply_markup)
-
-            elif "tep74" in account.interfaces:
-                jetton = await tonapi.jettons.get_info(account_id)
-                message_text = await messages.information_jetton(account, jetton)
+            if contract.contract_type == "jetton":
+                message_text = await messages.information_jetton(account, contract.details)
                 reply_markup = inline.information_jetton(account.address.to_userfriendly(), True)
                 return create_contract_article(account, message_text, reply_markup)
 
-            elif "tep62_item" in account.interfaces:
-                nft = await tonapi.nft.get_item_by_address(account_id)
-                message_text = await messages.information_nft(account, nft)
+            elif contract.contract_type == "nft":
+                message_text = await messages.information_nft(account, contract.details)
                 reply_markup = inline.information_nft(account.address.to_userfriendly(), True)
                 return create_contract_article(account, message_text, reply_markup)
 
-            elif "tep62_collection" in account.interfaces:
-                collection = await tonapi.nft.get_collection_by_collection_address(account_id)
-                message_text = await messages.information_collection(account, collection)
+            elif contract.contract_type == "collection":
+                message_text = await messages.information_collection(account, contract.details)
                 reply_markup = inline.information_collection(account.address.to_userfriendly(), True)
                 return create_contract_article(account, message_text, reply_markup)
 
             else:
-                domain = inline_query.query
-                if domain[-4:] == ".ton" or domain[-5:] == ".t.me":
-                    request = await tonapi.dns.resolve(domain.lower())
-                    account_id = request.wallet.address.to_userfriendly()
-                else:
-                    address = inline_query.query
-                    if len(address) == 48 or len(address) == 66:
-                        account_id = address
-                    else:
-                        account_id = None
-                if account_id:
-                    chl = f"ton://transfer/{account.address.to_userfriendly()}"
-                    preview_url = f"https://chart.googleapis.com/chart?chs=512x512&cht=qr&chl={chl}"
-                    message_text = await messages.information(account, preview_url)
-                    reply_markup = inline.information(account.address.to_userfriendly(), True)
-                    return create_contract_article(account, message_text, reply_markup)
+                chl = f"ton://transfer/{account.address.to_userfriendly()}"
+                preview_url = f"https://chart.googleapis.com/chart?chs=512x512&cht=qr&chl={chl}"
+                message_text = await messages.information(account, preview_url)
+                reply_markup = inline.information(account.address.to_userfriendly(), True)
+                return create_contract_article(account, message_text, reply_markup)
 
     except (TONAPIUnauthorizedError, TONAPITooManyRequestsError):
         raise
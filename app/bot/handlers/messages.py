@@ -1,98 +1,123 @@
-from aiogram import Dispatcher
+from aiogram import Bot, Dispatcher
 from aiogram.dispatcher import FSMContext
-from aiogram.types import Message
+from aiogram.types import Chat, ChatType, Message, User
 from pytonapi import AsyncTonapi
 from pytonapi.exceptions import TONAPIUnauthorizedError, TONAPITooManyRequestsError
 
 from app.bot.filters import IsPrivate
 from app.bot.handlers import windows
 from app.bot.keyboards import inline
+from app.bot.middlewares.userdata import create_tonapi
 from app.bot.middlewares.throttling import ThrottlingContext, EMOJIS_MAGNIFIER, rate_limit
 from app.bot.states import State
 from app.bot.texts import messages
 from app.bot.utils.crypto import encrypt_key
+from app.bot.utils.dns import DNS, is_domain
 from app.bot.utils.message import delete_message, edit_or_send_message
+from app.bot.utils.models import MODELS
+from app.bot.utils.requeue import DeferredLookup, DeferredLookups
+from app.bot.utils.resolver import ContractResolver
+from app.bot.utils.storage import BufferedRedisStorage
+from app.bot.utils.tonapi import TonapiClient
 from app.config import Config
 
 
+async def lookup(bot: Bot, state: FSMContext, tonapi: TonapiClient, chat_id: int, message_id: int,
+                 query: str) -> None:
+    """
+    Look up an address, domain or event and show it in the user's message.
+
+    :param bot: The Bot instance.
+    :param state: The FSMContext of the user.
+    :param tonapi: The client to make requests with.
+    :param chat_id: The ID of the chat.
+    :param message_id: The ID of the message to show the result in.
+    :param query: The address, domain or event ID.
+    """
+    match query:
+        case domain if is_domain(domain):
+            account_id = await DNS.resolve(tonapi, domain)
+        case address if len(address) == 48 or len(address) == 66:
+            account_id = address
+        case _:
+            account_id = None
+
+    if account_id:
+        resolver: ContractResolver = bot.get("contract_resolver")
+        contract = await resolver.resolve(tonapi, account_id)
+        account = contract.account
+
+        match contract.contract_type:
+            case "jetton":
+                await state.update_data(
+                    contract_type="jetton",
+                    **MODELS.dump(account=account, jetton=contract.details),
+                )
+                await windows.information_jetton(
+                    bot=bot, state=state,
+                    chat_id=chat_id, message_id=message_id,
+                )
+
+            case "nft":
+                await state.update_data(
+                    contract_type="nft",
+                    **MODELS.dump(account=account, nft=contract.details),
+                )
+                await windows.information_nft(
+                    bot=bot, state=state,
+                    chat_id=chat_id, message_id=message_id,
+                )
+            case "collection":
+                await state.update_data(
+                    contract_type="collection",
+                    **MODELS.dump(account=account, collection=contract.details),
+                )
+                await windows.information_collection(
+                    bot=bot, state=state,
+                    chat_id=chat_id, message_id=message_id,
+                )
+            case _:
+                await state.update_data(
+                    contract_type="account",
+                    **MODELS.dump(account=account),
+                )
+                await windows.information(
+                    bot=bot, state=state,
+                    chat_id=chat_id, message_id=message_id,
+                )
+    else:
+        event = await tonapi.events.get_event(event_id=query)
+        await state.update_data(from_pages=False, **MODELS.dump(event=event))
+        await windows.information_event(
+            bot=bot, state=state,
+            chat_id=chat_id, message_id=message_id,
+        )
+
+
 @rate_limit(2)
-async def main(message: Message, state: FSMContext, tonapi: AsyncTonapi, chat_id, message_id):
+async def main(message: Message, state: FSMContext, tonapi: TonapiClient, chat_id, message_id):
     if message.text:
+        deferred: DeferredLookups = message.bot.get("deferred_lookups")
+        if deferred:
+            deferred.cancel(chat_id)
+
         try:
             async with ThrottlingContext(bot=message.bot, state=state,
                                          chat_id=chat_id, message_id=message_id,
                                          emojis=EMOJIS_MAGNIFIER):
-                match message.text:
-                    case domain if domain[-4:] == ".ton" or domain[-5:] == ".t.me":
-                        request = await tonapi.dns.resolve(domain.lower())
-                        account_id = request.wallet.address.to_userfriendly()
-                    case address if len(address) == 48 or len(address) == 66:
-                        account_id = address
-                    case _:
-                        account_id = None
-
-                if account_id:
-                    account = await tonapi.accounts.get_info(account_id)
-
-                    match account.interfaces:
-                        case None:
-                            await state.update_data(
-                                contract_type="account",
-                                account=account.dict(),
-                            )
-                            await windows.information(
-                                bot=message.bot, state=state,
-                                chat_id=chat_id, message_id=message_id,
-                            )
-                        case interfaces if "tep74" in interfaces:
-                            jetton = await tonapi.jettons.get_info(account_id)
-                            await state.update_data(
-                                contract_type="jetton",
-                                account=account.dict(), jetton=jetton.dict(),
-                            )
-                            await windows.information_jetton(
-                                bot=message.bot, state=state,
-                                chat_id=chat_id, message_id=message_id,
-                            )
-
-                        case interfaces if "tep62_item" in interfaces:
-                            nft = await tonapi.nft.get_item_by_address(account_id)
-                            await state.update_data(
-                                contract_type="nft",
-                                account=account.dict(), nft=nft.dict(),
-                            )
-                            await windows.information_nft(
-                                bot=message.bot, state=state,
-                                chat_id=chat_id, message_id=message_id,
-                            )
-                        case interfaces if "tep62_collection" in interfaces:
-                            collection = await tonapi.nft.get_collection_by_collection_address(account_id)
-                            await state.update_data(
-                                contract_type="collection",
-                                account=account.dict(), collection=collection.dict(),
-                            )
-                            await windows.information_collection(
-                                bot=message.bot, state=state,
-                                chat_id=chat_id, message_id=message_id,
-                            )
-                        case _:
-                            await state.update_data(
-                                contract_type="account",
-                                account=account.dict(),
-                            )
-                            await windows.information(
-                                bot=message.bot, state=state,
-                                chat_id=chat_id, message_id=message_id,
-                            )
-                else:
-                    event = await tonapi.events.get_event(event_id=message.text)
-                    await state.update_data(from_pages=False, event=event.dict())
-                    await windows.information_event(
-                        bot=message.bot, state=state,
-                        chat_id=chat_id, message_id=message_id,
-                    )
-
-        except (TONAPIUnauthorizedError, TONAPITooManyRequestsError):
+                await lookup(message.bot, state, tonapi, chat_id, message_id, message.text)
+
+        except TONAPITooManyRequestsError:
+            if not (tonapi.shared and deferred):
+                raise
+            await windows.too_many_requests_deferred(
+                bot=message.bot, state=state,
+                chat_id=chat_id, message_id=message_id,
+            )
+            data = await state.get_data()
+            deferred.defer(chat_id, message.text, data.get("message_id"))
+
+        except TONAPIUnauthorizedError:
             raise
 
         except Exception as e:
@@ -114,6 +139,58 @@ async def main(message: Message, state: FSMContext, tonapi: AsyncTonapi, chat_id
     await delete_message(message)
 
 
+async def replay_lookup(dp: Dispatcher, lookup_: DeferredLookup) -> None:
+    """
+    Re-run a lookup deferred by the shared key's rate limit and edit in its result,
+    unless the user has moved on to another message since.
+
+    :param dp: The Dispatcher instance.
+    :param lookup_: The deferred lookup.
+    """
+    chat_id = lookup_.user_id
+    state = FSMContext(dp.storage, chat_id, chat_id)
+
+    # Windows set the FSM state of the current user and chat.
+    Dispatcher.set_current(dp)
+    Bot.set_current(dp.bot)
+    User.set_current(User(id=chat_id))
+    Chat.set_current(Chat(id=chat_id, type=ChatType.PRIVATE))
+
+    # Buffered like an update, so the edits keep the rendered digests current.
+    buffered = isinstance(dp.storage, BufferedRedisStorage)
+    if buffered:
+        dp.storage.begin()
+    try:
+        await _replay_lookup(dp, state, lookup_)
+    finally:
+        if buffered:
+            await dp.storage.flush()
+
+
+async def _replay_lookup(dp: Dispatcher, state: FSMContext, lookup_: DeferredLookup) -> None:
+    config: Config = dp.bot.get("config")
+    chat_id = lookup_.user_id
+
+    data = await state.get_data()
+    if data.get("message_id") != lookup_.message_id or data.get("tonapi_key"):
+        return
+
+    tonapi = create_tonapi(dp.bot, chat_id, config.tonapi.KEY, data.get("testnet", False))
+    try:
+        await lookup(dp.bot, state, tonapi, chat_id, lookup_.message_id, lookup_.query)
+
+    except TONAPITooManyRequestsError:
+        raise
+
+    except Exception:
+        await edit_or_send_message(
+            bot=dp.bot, state=state,
+            chat_id=chat_id, message_id=lookup_.message_id,
+            text=messages.not_found, markup=inline.go_main(),
+        )
+        await State.main.set()
+
+
 @rate_limit(1)
 async def set_api_key(message: Message, state: FSMContext, chat_id, message_id):
     if message.text:
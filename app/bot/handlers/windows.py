@@ -4,9 +4,8 @@ import datetime
 from aiogram import Bot
 from aiogram.dispatcher import FSMContext
 from aiogram.utils.markdown import hbold, hcode
-from aiogram.utils.parts import paginate
 from pytonapi.schema.accounts import Account
-from pytonapi.schema.events import AccountEvents, Event
+from pytonapi.schema.events import Event
 from pytonapi.schema.jettons import JettonInfo
 from pytonapi.schema.nft import NftItem, NftCollection
 
@@ -16,6 +15,9 @@ from app.bot.states import State
 from app.bot.texts import messages, buttons
 from app.bot.utils.address import AddressDisplay
 from app.bot.utils.message import edit_or_send_message
+from app.bot.utils.models import MODELS
+from app.bot.utils.pages import EventPageStore
+from app.bot.utils.tonapi import TonapiClient
 
 
 async def main(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
@@ -81,10 +83,22 @@ async def too_many_requests(bot: Bot, state: FSMContext, chat_id: int, message_i
     await State.main.set()
 
 
+async def too_many_requests_deferred(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
+    text = messages.too_many_requests__deferred
+    markup = inline.set_api_key()
+
+    await edit_or_send_message(
+        bot=bot, state=state,
+        chat_id=chat_id, message_id=message_id,
+        text=text, markup=markup,
+    )
+    await State.main.set()
+
+
 async def information(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
     data = await state.get_data()
 
-    account: Account = Account(**data["account"])
+    account: Account = MODELS.load(data, "account", Account)
     qr_data = f"ton://transfer/{account.address.to_userfriendly()}"
     qr_image = "https://telegra.ph//file/745d621b339ffe6568b13.jpg"
     qr_option = "box_size=30&border=7&image_padding=20"
@@ -103,8 +117,8 @@ async def information(bot: Bot, state: FSMContext, chat_id: int, message_id: int
 async def information_jetton(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
     data = await state.get_data()
 
-    account: Account = Account(**data["account"])
-    jetton: JettonInfo = JettonInfo(**data["jetton"])
+    account: Account = MODELS.load(data, "account", Account)
+    jetton: JettonInfo = MODELS.load(data, "jetton", JettonInfo)
 
     markup = inline.information_jetton(account.address.to_userfriendly())
     text = await messages.information_jetton(account, jetton)
@@ -120,8 +134,8 @@ async def information_jetton(bot: Bot, state: FSMContext, chat_id: int, message_
 async def information_nft(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
     data = await state.get_data()
 
-    account: Account = Account(**data["account"])
-    nft: NftItem = NftItem(**data["nft"])
+    account: Account = MODELS.load(data, "account", Account)
+    nft: NftItem = MODELS.load(data, "nft", NftItem)
 
     markup = inline.information_nft(account.address.to_userfriendly())
     text = await messages.information_nft(account, nft)
@@ -137,8 +151,8 @@ async def information_nft(bot: Bot, state: FSMContext, chat_id: int, message_id:
 async def information_collection(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
     data = await state.get_data()
 
-    account: Account = Account(**data["account"])
-    collection: NftCollection = NftCollection(**data["collection"])
+    account: Account = MODELS.load(data, "account", Account)
+    collection: NftCollection = MODELS.load(data, "collection", NftCollection)
 
     markup = inline.information_collection(account.address.to_userfriendly())
     text = await messages.information_collection(account, collection)
@@ -154,7 +168,7 @@ async def information_collection(bot: Bot, state: FSMContext, chat_id: int, mess
 async def information_event(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
     data = await state.get_data()
 
-    event: Event = Event(**data["event"])
+    event: Event = MODELS.load(data, "event", Event)
 
     markup = inline.information_event()
     text = await messages.contract_event(event)
@@ -170,7 +184,7 @@ async def information_event(bot: Bot, state: FSMContext, chat_id: int, message_i
 async def detail_attributes(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
     data = await state.get_data()
 
-    nft: NftItem = NftItem(**data["nft"])
+    nft: NftItem = MODELS.load(data, "nft", NftItem)
 
     markup = inline.back()
     text = '\n\n'.join(
@@ -189,14 +203,13 @@ async def detail_metadata(bot: Bot, state: FSMContext, chat_id: int, message_id:
     data = await state.get_data()
 
     if data["contract_type"] == "nft":
-        item: NftItem = NftItem(**data["nft"])
+        metadata = MODELS.load(data, "nft", NftItem).metadata
     elif data["contract_type"] == "jetton":
-        item: JettonInfo = JettonInfo(**data["jetton"])
-        item.metadata = item.metadata.dict()
+        metadata = MODELS.load(data, "jetton", JettonInfo).metadata.dict()
     else:
-        item: NftCollection = NftCollection(**data["collection"])
+        metadata = MODELS.load(data, "collection", NftCollection).metadata
 
-    text = hcode(json.dumps(item.metadata, ensure_ascii=False, sort_keys=True, indent=2))
+    text = hcode(json.dumps(metadata, ensure_ascii=False, sort_keys=True, indent=2))
     markup = inline.back()
 
     await edit_or_send_message(
@@ -210,7 +223,7 @@ async def detail_metadata(bot: Bot, state: FSMContext, chat_id: int, message_id:
 async def information_event_json(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
     data = await state.get_data()
 
-    event: Event = Event(**data["event"])
+    event: Event = MODELS.load(data, "event", Event)
 
     markup = inline.back()
     text = hcode(json.dumps(event.dict(), ensure_ascii=False, sort_keys=True, indent=2))
@@ -223,18 +236,18 @@ async def information_event_json(bot: Bot, state: FSMContext, chat_id: int, mess
     await State.information_event_json.set()
 
 
-async def events_page(bot: Bot, state: FSMContext, chat_id: int, message_id: int) -> None:
+async def events_page(bot: Bot, state: FSMContext, tonapi: TonapiClient, chat_id: int, message_id: int) -> None:
     data = await state.get_data()
 
-    account: Account = Account(**data["account"])
-    data_items = AccountEvents(**data["events"])
+    account: Account = MODELS.load(data, "account", Account)
+    pages: EventPageStore = bot.get("event_pages")
 
-    current_page, limit = data.get("page", 1), 10
-    total_pages = data.get("total_pages", 2)
+    current_page = data.get("page", 1)
+    cursors: list[int] = data.get("cursors", [0])
+    total_pages = len(cursors)
 
-    items = [(buttons.create_event_button(event), event.event_id)
-             for event in paginate(data_items.events, current_page - 1, limit)]
-    total_pages += 1 if len(items) == limit else 0
+    rows = await pages.fetch(tonapi, chat_id, account.address.to_userfriendly(), cursors[current_page - 1])
+    items = [(row.label, row.event_id) for row in rows]
 
     inline_query = f"{callback_data.events} {account.address.to_userfriendly()}"
     after_buttons = inline.export_as__csv_json().inline_keyboard
@@ -1,9 +1,11 @@
 from aiogram import Dispatcher
 
+from .statebuffer import StateBufferMiddleware
 from .throttling import ThrottlingMiddleware
 from .userdata import UserDataMiddleware
 
 
 def setup(dp: Dispatcher):
+    dp.setup_middleware(StateBufferMiddleware())
     dp.setup_middleware(ThrottlingMiddleware())
     dp.setup_middleware(UserDataMiddleware())
@@ -0,0 +1,23 @@
+from aiogram import Dispatcher
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.types import Update
+
+from app.bot.utils.storage import BufferedRedisStorage
+
+
+class StateBufferMiddleware(BaseMiddleware):
+    """
+    Memoizes FSM state and data for every update and flushes the changes once at its end.
+    """
+
+    # noinspection PyUnusedLocal
+    async def on_pre_process_update(self, update: Update, data: dict):
+        storage = Dispatcher.get_current().storage
+        if isinstance(storage, BufferedRedisStorage):
+            storage.begin()
+
+    # noinspection PyUnusedLocal
+    async def on_post_process_update(self, update: Update, result: list, data: dict):
+        storage = Dispatcher.get_current().storage
+        if isinstance(storage, BufferedRedisStorage):
+            await storage.flush()
@@ -4,24 +4,59 @@ import asyncio
 import time
 from asyncio import Event, Lock
 from contextlib import suppress
+from enum import Enum
 from types import TracebackType
 
 from aiogram import Dispatcher, Bot
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.handler import CancelHandler, current_handler
 from aiogram.dispatcher.middlewares import BaseMiddleware
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, ChatActions, Update
 from aiogram.utils.exceptions import Throttled
 
-USERS_THROTTLED: list[int] = []
+from ..utils.busy import BusyUsers
+from ..utils.outbound import outbound_priority
+from ..utils.scheduler import Priority
+from ..utils.storage import BufferedRedisStorage
 
 EMOJIS_HOURGLASS: tuple[str, str] = ("⏳", "⌛️")
 EMOJIS_MAGNIFIER: tuple[str, str] = ("🔍", "🔎")
 
 
+class Progress(str, Enum):
+    # Swap the emojis in the message every interval.
+    ANIMATION = "animation"
+    # Show the first emoji once, then keep a chat action ("typing...") alive.
+    CHAT_ACTION = "chat_action"
+    # Show the first emoji once, then the milestones reported with ThrottlingContext.progress.
+    MILESTONES = "milestones"
+
+
+class ProgressStats:
+    """
+    Telegram requests spent on progress indication.
+    """
+
+    def __init__(self) -> None:
+        self.requests = {mode: 0 for mode in Progress}
+        self.milestones_skipped = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            **{f"{mode.value}_requests": count for mode, count in self.requests.items()},
+            "milestones_skipped": self.milestones_skipped,
+        }
+
+
+PROGRESS = ProgressStats()
+
+
 class ThrottlingContext:
     DEFAULT_INTERVAL = 3.0
     DEFAULT_INITIAL_SLEEP = 0.0
+    # Telegram shows a chat action for 5 seconds.
+    CHAT_ACTION_INTERVAL = 4.5
 
     def __init__(
             self,
@@ -33,7 +68,14 @@ class ThrottlingContext:
             emojis: tuple[str, str] = EMOJIS_HOURGLASS,
             interval: float = DEFAULT_INTERVAL,
             initial_sleep: float = DEFAULT_INITIAL_SLEEP,
+            mode: Progress = Progress.ANIMATION,
+            action: str = ChatActions.TYPING,
     ) -> None:
+        """
+        :param interval: Seconds between animation frames, or between milestone edits.
+        :param mode: How progress is shown, see :class:`Progress`.
+        :param action: The chat action sent in :attr:`Progress.CHAT_ACTION` mode.
+        """
         self.chat_id = chat_id
         self.message_id = message_id
         self.emojis = emojis
@@ -41,7 +83,11 @@ class ThrottlingContext:
         self.initial_sleep = initial_sleep
         self.state = state
         self.bot = bot
+        self.mode = mode
+        self.action = action
 
+        self._milestone: str | None = None
+        self._milestone_event = Event()
         self._lock = Lock()
         self._close_event = Event()
         self._closed_event = Event()
@@ -55,25 +101,63 @@ class ThrottlingContext:
         with suppress(asyncio.TimeoutError):
             await asyncio.wait_for(self._close_event.wait(), interval)
 
-    async def _worker(self) -> None:
+    async def _frame(self, text: str) -> None:
         from ..utils.message import edit_or_send_message
+
+        PROGRESS.requests[self.mode] += 1
+        # Progress frames yield to the rest of the bot's traffic.
+        with outbound_priority(Priority.BULK):
+            await edit_or_send_message(
+                bot=self.bot, state=self.state,
+                chat_id=self.chat_id, message_id=self.message_id,
+                text=text,
+            )
+
+    async def _chat_action(self) -> None:
+        PROGRESS.requests[self.mode] += 1
+        with outbound_priority(Priority.BULK):
+            await self.bot.send_chat_action(self.chat_id, self.action)
+
+    async def _worker(self) -> None:
         try:
             counter = 0
             await self._wait(self.initial_sleep)
             while not self._close_event.is_set():
                 start = time.monotonic()
 
-                await edit_or_send_message(
-                    bot=self.bot, state=self.state,
-                    chat_id=self.chat_id, message_id=self.message_id,
-                    text=self.emojis[0] if counter % 2 == 0 else self.emojis[1],
-                )
+                if self.mode == Progress.ANIMATION or counter == 0:
+                    await self._frame(self.emojis[0] if counter % 2 == 0 else self.emojis[1])
+                if self.mode == Progress.CHAT_ACTION:
+                    await self._chat_action()
+                elif self.mode == Progress.MILESTONES and counter > 0:
+                    await self._milestone_event.wait()
+                    self._milestone_event.clear()
+                    if self._milestone is None:
+                        continue
+                    start = time.monotonic()
+                    text, self._milestone = self._milestone, None
+                    await self._frame(text)
+
                 counter += 1
-                interval = self.interval - (time.monotonic() - start)
-                await self._wait(interval)
+                interval = self.CHAT_ACTION_INTERVAL if self.mode == Progress.CHAT_ACTION else self.interval
+                await self._wait(interval - (time.monotonic() - start))
         finally:
             self._closed_event.set()
 
+    def progress(self, text: str) -> None:
+        """
+        Report a progress milestone, e.g. the number of events fetched so far.
+
+        In :attr:`Progress.MILESTONES` mode the latest milestone is shown, at most once
+        per interval; in the other modes milestones are ignored.
+        """
+        if self.mode != Progress.MILESTONES:
+            return
+        if self._milestone is not None:
+            PROGRESS.milestones_skipped += 1
+        self._milestone = text
+        self._milestone_event.set()
+
     async def _run(self) -> None:
         async with self._lock:
             self._close_event.clear()
@@ -88,12 +172,18 @@ class ThrottlingContext:
                 return
             if not self._close_event.is_set():
                 self._close_event.set()
+                self._milestone_event.set()
                 await self._closed_event.wait()
             self._task = None
 
     async def __aenter__(self) -> ThrottlingContext:
+        # Persist the buffered state before a long operation, so it is not lost if the operation fails.
+        storage = self.state.storage
+        if isinstance(storage, BufferedRedisStorage):
+            await storage.commit()
         await self._run()
-        USERS_THROTTLED.append(self.chat_id)
+        busy: BusyUsers = self.bot.get("busy_users")
+        await busy.acquire(int(self.chat_id))
         return self
 
     async def __aexit__(
@@ -103,7 +193,21 @@ class ThrottlingContext:
             traceback: TracebackType | None,
     ) -> any:
         await self._stop()
-        USERS_THROTTLED.remove(self.chat_id)
+        busy: BusyUsers = self.bot.get("busy_users")
+        await busy.release(int(self.chat_id))
+
+
+async def reject_update(update: Update) -> None:
+    """
+    Turn an update down the way :class:`ThrottlingMiddleware` does:
+    delete the message or answer the callback query; other updates are dropped.
+    """
+    from ..utils.message import delete_message
+
+    if update.message:
+        await delete_message(update.message)
+    elif update.callback_query:
+        await update.callback_query.answer()
 
 
 class ThrottlingMiddleware(BaseMiddleware):
@@ -126,7 +230,8 @@ class ThrottlingMiddleware(BaseMiddleware):
         dispatcher = Dispatcher.get_current()
         handler = current_handler.get()
 
-        if int(message.from_user.id) in USERS_THROTTLED:
+        busy: BusyUsers = message.bot.get("busy_users")
+        if await busy.is_busy(int(message.from_user.id)):
             await delete_message(message)
             raise CancelHandler()
 
@@ -148,7 +253,8 @@ class ThrottlingMiddleware(BaseMiddleware):
         dispatcher = Dispatcher.get_current()
         handler = current_handler.get()
 
-        if int(call.from_user.id) in USERS_THROTTLED:
+        busy: BusyUsers = call.bot.get("busy_users")
+        if await busy.is_busy(int(call.from_user.id)):
             await call.answer()
             raise CancelHandler()
 
@@ -3,12 +3,43 @@ from aiogram.dispatcher import FSMContext
 from aiogram.types import User
 from aiogram.dispatcher.middlewares import LifetimeControllerMiddleware
 from cryptography.fernet import InvalidToken
-from pytonapi import AsyncTonapi
 
-from app.bot.utils.crypto import decrypt_key
+from app.bot.utils.dns import DNS
+from app.bot.utils.tonapi import TonapiClient, TonapiPool
 from app.db.database import Database
 
 
+def create_tonapi(bot: Bot, user_id: int, tonapi_key: str, testnet: bool) -> TonapiClient:
+    """
+    Create the TONAPI client of a user.
+
+    :param bot: The Bot instance holding the shared TONAPI components.
+    :param user_id: The ID of the user.
+    :param tonapi_key: The plain API key to use.
+    :param testnet: Whether the client targets the testnet.
+    :return: The :class:`TonapiClient`.
+    """
+    from ...config import Config
+    config: Config = bot.get("config")
+    pool: TonapiPool = bot.get("tonapi_pool")
+    shared = tonapi_key == config.tonapi.KEY
+    # Addresses rendered for the update are labelled with domains of its network.
+    DNS.use_network(testnet)
+
+    return TonapiClient(
+        # The shared key reports rate limits right away so the adaptive layer can react.
+        pool.get(tonapi_key, testnet, max_retries=1 if shared else None),
+        user_id=user_id,
+        shared=shared,
+        testnet=testnet,
+        scheduler=bot.get("tonapi_scheduler"),
+        cache=bot.get("tonapi_cache"),
+        singleflight=bot.get("tonapi_singleflight"),
+        limiter=bot.get("tonapi_limiter"),
+        breaker=bot.get("tonapi_breaker"),
+    )
+
+
 class UserDataMiddleware(LifetimeControllerMiddleware):
     skip_patterns = ['error', 'update']
 
@@ -16,6 +47,7 @@ class UserDataMiddleware(LifetimeControllerMiddleware):
         dp: Dispatcher = Dispatcher.get_current()
         bot: Bot = Bot.get_current()
         db: Database = bot.get("db")
+        pool: TonapiPool = bot.get("tonapi_pool")
 
         from ...config import Config
         config: Config = bot.get("config")
@@ -29,7 +61,7 @@ class UserDataMiddleware(LifetimeControllerMiddleware):
 
         if tonapi_key:
             try:
-                tonapi_key = decrypt_key(config.tonapi.ENCRYPTION_KEY, tonapi_key)
+                tonapi_key = pool.decrypt(tonapi_key)
             except InvalidToken:
                 async with state.proxy() as data:
                     data.pop("tonapi_key")
@@ -37,7 +69,7 @@ class UserDataMiddleware(LifetimeControllerMiddleware):
         else:
             tonapi_key = config.tonapi.KEY
 
-        tonapi = AsyncTonapi(tonapi_key, testnet=testnet, max_retries=10)
+        tonapi = create_tonapi(bot, user.id, tonapi_key, testnet)
         message_id = user_data.get("message_id", None)
 
         data["message_id"] = message_id
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import suppress
+from multiprocessing import Queue
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.utils.exceptions import TelegramAPIError
+
+from .utils.busy import BusyUsers
+
+
+def user_of(update: dict) -> int:
+    """
+    The ID of the user an update comes from, or of its chat when there is no user.
+    """
+    for key, value in update.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        user = value.get("from") or value.get("user") or value.get("chat")
+        if user:
+            return abs(user["id"])
+    return 0
+
+
+class ShardedDispatcher(Dispatcher):
+    """
+    :class:`Dispatcher` that hands every update to the worker process of its shard
+    instead of processing it, sharding by user, so the updates of a user always
+    reach the same worker.
+    """
+
+    def __init__(self, bot: Bot, queues: list[Queue], **kwargs) -> None:
+        super().__init__(bot, **kwargs)
+        self.queues = queues
+
+    async def process_update(self, update: Update) -> None:
+        data = update.to_python()
+        self.queues[user_of(data) % len(self.queues)].put((time.time(), data))
+
+    async def report(self, interval: float = 60) -> None:
+        """
+        Log the queue depth of every worker, until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            depths = [queue.qsize() for queue in self.queues]
+            logging.info(f"Shard queue depths: {depths}")
+
+
+class ShardWorker:
+    """
+    Processes the updates of one shard.
+
+    Updates of the same user are queued and processed one after another, in the order
+    they were received, so FSM transitions stay consistent; different users are processed
+    concurrently, at most ``max_in_flight`` updates at once. A queued update only takes
+    a slot once it is the user's turn, so one user waiting on a long operation cannot
+    hold the shard's slots.
+
+    An update is rejected on arrival, as :class:`ThrottlingMiddleware` would, if its user
+    has a long operation in flight or already has ``max_pending`` updates queued, rather
+    than being processed minutes later. At most ``max_buffered`` updates are taken from
+    the shard's queue at once.
+    """
+
+    def __init__(
+            self,
+            dp: Dispatcher,
+            queue: Queue,
+            shard: int,
+            max_in_flight: int = 100,
+            max_pending: int = 3,
+            max_buffered: int = 1000,
+    ) -> None:
+        self.dp = dp
+        self.queue = queue
+        self.shard = shard
+        self.max_pending = max_pending
+
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._buffered = asyncio.Semaphore(max_buffered)
+        # Updates waiting behind the one being processed, for every user with a drainer.
+        self._pending: dict[int, deque[tuple[float, Update]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._in_flight = 0
+
+        self.processed = 0
+        self.rejected = 0
+        self.waits: deque[float] = deque(maxlen=1000)
+        self.latencies: deque[float] = deque(maxlen=1000)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, received_at: float, update: Update) -> None:
+        async with self._slots:
+            self._in_flight += 1
+            self.waits.append(time.time() - received_at)
+            try:
+                await self.dp.updates_handler.notify(update)
+            except Exception:
+                logging.exception(f"Shard {self.shard} failed to process update {update.update_id}")
+            finally:
+                self.latencies.append(time.time() - received_at)
+                self.processed += 1
+                self._in_flight -= 1
+                self._buffered.release()
+
+    async def _drain(self, user_id: int) -> None:
+        pending = self._pending[user_id]
+        try:
+            while pending:
+                await self._process(*pending.popleft())
+        finally:
+            del self._pending[user_id]
+
+    async def _reject(self, update: Update) -> None:
+        from .middlewares.throttling import reject_update
+
+        self.rejected += 1
+        self._buffered.release()
+        with suppress(TelegramAPIError):
+            await reject_update(update)
+
+    def _admit(self, received_at: float, update: Update, user_id: int) -> None:
+        pending = self._pending.get(user_id)
+        if pending is None:
+            self._pending[user_id] = deque([(received_at, update)])
+            self._spawn(self._drain(user_id))
+            return
+
+        busy: BusyUsers = self.dp.bot.get("busy_users")
+        if len(pending) >= self.max_pending or busy.is_local(user_id):
+            self._spawn(self._reject(update))
+        else:
+            pending.append((received_at, update))
+
+    async def run(self) -> None:
+        """
+        Process updates from the queue until it yields ``None``.
+        """
+        Dispatcher.set_current(self.dp)
+        Bot.set_current(self.dp.bot)
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self._buffered.acquire()
+            item = await loop.run_in_executor(None, self.queue.get)
+            if item is None:
+                self._buffered.release()
+                break
+
+            received_at, data = item
+            self._admit(received_at, Update(**data), user_of(data))
+
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    async def report(self, interval: float = 60) -> None:
+        """
+        Log the stats of the worker, until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            logging.info(f"Shard {self.shard} stats: {self.stats}")
+
+    @staticmethod
+    def _percentile(values: deque[float], p: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 1)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "pending": sum(len(pending) for pending in self._pending.values()),
+            "in_flight": self._in_flight,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "wait_p50_ms": self._percentile(self.waits, .5),
+            "wait_p95_ms": self._percentile(self.waits, .95),
+            "latency_p50_ms": self._percentile(self.latencies, .5),
+            "latency_p95_ms": self._percentile(self.latencies, .95),
+        }
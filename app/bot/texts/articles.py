@@ -3,10 +3,11 @@ from datetime import datetime
 from aiogram.types import InlineQueryResultArticle, InputTextMessageContent, InlineKeyboardMarkup
 from pytonapi.schema.accounts import Account
 from pytonapi.schema.events import AccountEvent
-from pytonapi.schema.jettons import JettonBalance, JettonHolder, JettonInfo
+from pytonapi.schema.jettons import JettonBalance, JettonInfo
 from pytonapi.schema.nft import NftItem
 
 from app.bot.utils.address import AddressDisplay
+from app.bot.utils.holders import Holder
 
 
 def create_contract_article(account: Account, message_text: str, reply_markup: InlineKeyboardMarkup
@@ -101,16 +102,16 @@ def create_event_article(event: AccountEvent) -> InlineQueryResultArticle:
     )
 
 
-def create_holders(jetton: JettonInfo, holder: JettonHolder) -> InlineQueryResultArticle:
-    holder_address = holder.address.to_userfriendly()
-    holder_balance = round(int(holder.balance) / 10 ** int(jetton.metadata.decimals), 2)
+def create_holders(jetton: JettonInfo, holder: Holder) -> InlineQueryResultArticle:
+    holder_address = holder.address
+    holder_balance = round(holder.balance, 2)
 
     title = (
-        f"{holder_address[0:8]}. . .{holder_address[-6:]} - {holder_balance:,} {jetton.metadata.symbol}"
+        f"#{holder.rank} {holder_address[0:8]}. . .{holder_address[-6:]} - {holder_balance:,} {jetton.metadata.symbol}"
     )
     description = (
-        f"{jetton.metadata.name or 'Unknown'} "
-        "• Verified" if jetton.verification == "whitelist" else "• Not Verified"
+        f"{holder.share:.2%} • {jetton.metadata.name or 'Unknown'} "
+        f"{'• Verified' if jetton.verification == 'whitelist' else '• Not Verified'}"
     )
     thumb_url = jetton.metadata.image if jetton.metadata.image else "https://telegra.ph//file/784afcdf40bff1e0f06f9.jpg"
     thumb_url = f"https://ipfs.io/ipfs/{thumb_url}" if thumb_url.startswith("ipfs://") else thumb_url
@@ -8,7 +8,7 @@ from pytonapi.schema.nft import NftItem, NftCollection
 
 from app.bot.utils.address import AddressDisplay
 from app.bot.utils.links import GetgemsLink
-from app.bot.utils.coingecko import Coingecko
+from app.bot.utils.coingecko import PRICE
 
 main = (
     f"{hide_link('https://telegra.ph//file/1e7bbb0756d2bf7ba926a.jpg')}"
@@ -84,6 +84,12 @@ too_many_requests__error = (
     "<b>Rate limit exceeded!</b>\n\n"
     "• Please try again later, or set your API key."
 )
+too_many_requests__deferred = (
+    f"{hide_link('https://telegra.ph//file/da188a306888acb19f1ae.jpg')}"
+    "<b>Rate limit exceeded!</b>\n\n"
+    "• Your request is queued, the result will appear here shortly.\n"
+    "• Or set your API key."
+)
 
 not_found = (
     f"{hide_link('https://telegra.ph//file/2e6bd84cd0ef81f879e5d.jpg')}"
@@ -142,6 +148,11 @@ confirm_export_all_time = (
     f"{hcode('{export_type}')}\n\n"
     f"{hbold('Confirm export?')}\n"
 )
+export_progress = (
+    f"{hbold('Exporting...')}\n\n"
+    f"• {hbold('Fetched events:')}\n"
+    f"{hcode('{total_rows}')}"
+)
 export_completed = (
     "#Export\n\n"
     f"• {hbold('Address:')}\n"
@@ -189,7 +200,7 @@ export_failed = (
 
 
 async def information(account: Account, preview: str) -> str:
-    price = (await Coingecko().get()).ton.usd
+    price = PRICE.usd
 
     amount = account.balance.to_amount(8)
 
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from .scheduler import Priority
+from ..exceptions import TONAPICircuitOpenError
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit for the shared key adapted by AIMD.
+
+    Every successful request raises the limit by ``1 / limit`` (about one slot per
+    round of requests), every rate limit answer halves it. Decreases are applied
+    at most once per ``decrease_interval`` so one burst of 429s counts once.
+    """
+
+    def __init__(
+            self,
+            initial: int = 8,
+            minimum: int = 1,
+            maximum: int = 64,
+            decrease: float = 0.5,
+            decrease_interval: float = 1.0,
+    ) -> None:
+        self.limit = float(min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.decrease_interval = decrease_interval
+
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+
+        self._decreased_at = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._decreased_at >= self.decrease_interval:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._decreased_at = now
+                    self.decreases += 1
+                    logging.info(f"TONAPI concurrency limit lowered to {int(self.limit)}")
+            elif self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.increases += 1
+            self._condition.notify_all()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for rate limit answers on the shared key.
+
+    * closed: every request passes.
+    * strained: a rate limit answer was seen within ``window`` seconds, or the circuit
+      has just recovered; bulk requests are shed, interactive ones pass.
+    * open: ``threshold`` rate limit answers were seen within ``window`` seconds;
+      every request is shed for ``cooldown`` seconds, then the circuit is strained
+      for another ``cooldown`` before closing.
+    """
+    CLOSED = "closed"
+    STRAINED = "strained"
+    OPEN = "open"
+
+    def __init__(self, threshold: int = 5, window: float = 10.0, cooldown: float = 15.0) -> None:
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+
+        self.trips = 0
+        self.shed = {priority.name.lower(): 0 for priority in Priority}
+
+        self._failures: deque[float] = deque()
+        self._opened_until = 0.0
+        self._strained_until = 0.0
+        self._last_state = self.CLOSED
+
+    def _prune(self, now: float) -> None:
+        while self._failures and now - self._failures[0] > self.window:
+            self._failures.popleft()
+
+    def _state(self, now: float) -> str:
+        if now < self._opened_until:
+            return self.OPEN
+        self._prune(now)
+        if self._failures or now < self._strained_until:
+            return self.STRAINED
+        return self.CLOSED
+
+    @property
+    def state(self) -> str:
+        """
+        The current state; a change is logged the first time it is seen.
+        """
+        state = self._state(time.monotonic())
+        if state != self._last_state:
+            logging.warning(f"TONAPI circuit breaker {self._last_state} -> {state}")
+            self._last_state = state
+        return state
+
+    def allows(self, priority: Priority) -> bool:
+        state = self.state
+        return state == self.CLOSED or (state == self.STRAINED and priority == Priority.INTERACTIVE)
+
+    def check(self, priority: Priority) -> None:
+        """
+        Shed the request if the circuit does not allow its priority.
+
+        :raises TONAPICircuitOpenError: If the request is shed.
+        """
+        if not self.allows(priority):
+            name = priority.name.lower()
+            self.shed[name] += 1
+            raise TONAPICircuitOpenError(name)
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        self._prune(now)
+        self._failures.append(now)
+        if len(self._failures) >= self.threshold:
+            self._failures.clear()
+            self._opened_until = now + self.cooldown
+            self._strained_until = self._opened_until + self.cooldown
+            self.trips += 1
+        # Log the transition right away.
+        _ = self.state
+
+    async def wait(self, priority: Priority = Priority.INTERACTIVE, interval: float = 1.0) -> None:
+        """
+        Wait until the circuit allows requests of the given priority.
+        """
+        while not self.allows(priority):
+            await asyncio.sleep(interval)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "shed": dict(self.shed),
+        }
@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from aiogram.utils.markdown import hlink
 from pytonapi.schema.accounts import AccountAddress, Account
 
+from .dns import DNS
+
 
 @dataclass
 class AddressDisplay:
@@ -16,6 +18,8 @@ class AddressDisplay:
 
         if addr_book.get(self.address):
             self.name = addr_book.get(self.address)
+        elif not self.name:
+            self.name = DNS.domain(self.address)
         if self.address in scam_book:
             self.is_scam = True
 
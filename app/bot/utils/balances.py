@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from pytonapi.schema.jettons import JettonBalance
+
+from .tonapi import TonapiClient
+
+
+@dataclass
+class BalanceSnapshot:
+    pages: list[list[JettonBalance]]
+    created_at: float = field(default_factory=time.monotonic)
+
+    def page(self, index: int) -> list[JettonBalance]:
+        return self.pages[index] if index < len(self.pages) else []
+
+
+class JettonBalanceCache:
+    """
+    Short-lived snapshots of an account's jetton balances for inline scrolling.
+
+    The first page of an inline session takes a snapshot (unless one younger than
+    ``fresh`` exists) and splits it into pages once; the following pages of the session
+    are served from the snapshot for up to ``ttl``, so scrolling costs a single upstream request.
+    """
+
+    def __init__(self, page_size: int = 50, fresh: int = 10, ttl: int = 300, max_size: int = 1024) -> None:
+        self.page_size = page_size
+        self.fresh = fresh
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._snapshots: OrderedDict[tuple[str, bool], BalanceSnapshot] = OrderedDict()
+
+    def _get(self, key: tuple[str, bool], max_age: float) -> BalanceSnapshot | None:
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            return None
+        if time.monotonic() - snapshot.created_at > max_age:
+            del self._snapshots[key]
+            return None
+        self._snapshots.move_to_end(key)
+        return snapshot
+
+    def _put(self, key: tuple[str, bool], balances: list[JettonBalance]) -> BalanceSnapshot:
+        pages = [balances[i:i + self.page_size] for i in range(0, len(balances), self.page_size)]
+        snapshot = self._snapshots[key] = BalanceSnapshot(pages)
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self.max_size:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    async def page(self, tonapi: TonapiClient, account_id: str, offset: int) -> list[JettonBalance]:
+        """
+        Return the balances of an inline page.
+
+        :param tonapi: The client to make requests with.
+        :param account_id: The account to list balances of.
+        :param offset: The inline offset (a multiple of the page size).
+        :return: The balances on the page.
+        """
+        key = account_id, tonapi.testnet
+        snapshot = self._get(key, self.ttl if offset else self.fresh)
+
+        if snapshot is None:
+            self.misses += 1
+            items = await tonapi.accounts.get_jettons_balances(account_id=account_id)
+            snapshot = self._put(key, items.balances)
+        else:
+            self.hits += 1
+
+        return snapshot.page(offset // self.page_size)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "snapshots": len(self._snapshots),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
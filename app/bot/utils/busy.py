@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+
+class BusyUsers:
+    """
+    Users with a long operation in flight, shared between replicas.
+
+    Each replica keeps its own users in a local set and holds a lease for them in
+    a Redis sorted set (member: user ID, score: lease expiry). Leases are renewed
+    by :meth:`run` while the operation lasts, so the users of a crashed replica
+    are released after ``ttl`` at most.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = 60, key: str = "busy") -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.key = key
+
+        self._local: dict[int, int] = {}
+
+        self.acquired = 0
+        self.rejected = 0
+        self.errors = 0
+
+    async def acquire(self, user_id: int) -> None:
+        """
+        Mark the user as busy; calls may be nested.
+        """
+        self._local[user_id] = self._local.get(user_id, 0) + 1
+        if self._local[user_id] > 1:
+            return
+        self.acquired += 1
+        try:
+            await self.redis.zadd(self.key, {user_id: time.time() + self.ttl})
+        except RedisError as e:
+            self.errors += 1
+            logging.warning(f"Busy lease write failed: {e}")
+
+    async def release(self, user_id: int) -> None:
+        count = self._local.get(user_id, 0) - 1
+        if count > 0:
+            self._local[user_id] = count
+            return
+        self._local.pop(user_id, None)
+        try:
+            await self.redis.zrem(self.key, user_id)
+        except RedisError as e:
+            self.errors += 1
+            logging.warning(f"Busy lease release failed: {e}")
+
+    def is_local(self, user_id: int) -> bool:
+        """
+        Check whether the user has a long operation in flight on this process, without I/O.
+        """
+        return user_id in self._local
+
+    async def is_busy(self, user_id: int) -> bool:
+        """
+        Check whether the user has a long operation in flight on any replica.
+        """
+        busy = user_id in self._local
+        if not busy:
+            try:
+                expires = await self.redis.zscore(self.key, user_id)
+            except RedisError as e:
+                self.errors += 1
+                logging.warning(f"Busy lease read failed: {e}")
+                expires = None
+            busy = expires is not None and expires > time.time()
+        self.rejected += busy
+        return busy
+
+    async def count(self) -> int:
+        """
+        The number of busy users on all replicas.
+        """
+        return await self.redis.zcount(self.key, time.time(), "+inf")
+
+    async def run(self) -> None:
+        """
+        Renew the leases of the local users and drop expired leases, until cancelled.
+        """
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            now = time.time()
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    if self._local:
+                        pipe.zadd(self.key, {user_id: now + self.ttl for user_id in self._local}, xx=True)
+                    pipe.zremrangebyscore(self.key, "-inf", now)
+                    await pipe.execute()
+            except RedisError as e:
+                self.errors += 1
+                logging.warning(f"Busy lease renewal failed: {e}")
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "local": len(self._local),
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
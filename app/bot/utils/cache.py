@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from pydantic import BaseModel
+from pytonapi.exceptions import TONAPINotFoundError
+from pytonapi.schema.accounts import Account
+from pytonapi.schema.dns import DNSRecord
+from pytonapi.schema.jettons import JettonInfo
+from pytonapi.schema.nft import NftItem, NftCollection
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from .models import hydrate
+from ..exceptions import TONAPICachedNotFoundError
+
+
+@dataclass
+class CachePolicy:
+    model: type[BaseModel]
+    ttl: int
+    negative_ttl: int = 30
+
+
+class ResponseCache:
+    """
+    Redis-backed cache of TONAPI entity lookups shared by all replicas.
+
+    Entries are partitioned by network and endpoint, stored as zlib-compressed
+    compact JSON, and "not found" answers are cached for a short time as well.
+    Endpoints without a policy are passed through untouched.
+    """
+    POLICIES: dict[str, CachePolicy] = {
+        "accounts.get_info": CachePolicy(Account, ttl=15),
+        "jettons.get_info": CachePolicy(JettonInfo, ttl=300),
+        "nft.get_item_by_address": CachePolicy(NftItem, ttl=60),
+        "nft.get_collection_by_collection_address": CachePolicy(NftCollection, ttl=300),
+        "dns.resolve": CachePolicy(DNSRecord, ttl=600),
+    }
+    NOT_FOUND = b"\x00"
+
+    def __init__(self, redis: Redis, prefix: str = "tonapi") -> None:
+        self.redis = redis
+        self.prefix = prefix
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.errors = 0
+
+    def key(self, endpoint: str, testnet: bool, args: tuple, kwargs: dict) -> str:
+        params = json.dumps([args, sorted(kwargs.items())], default=str, separators=(",", ":"))
+        digest = hashlib.sha1(params.encode()).hexdigest()
+        return f"{self.prefix}:{'testnet' if testnet else 'mainnet'}:{endpoint}:{digest}"
+
+    @staticmethod
+    def encode(model: BaseModel) -> bytes:
+        return zlib.compress(json.dumps(model.dict(), separators=(",", ":")).encode())
+
+    @staticmethod
+    def decode(raw: bytes) -> dict:
+        return json.loads(zlib.decompress(raw))
+
+    async def _get(self, key: str) -> bytes | None:
+        try:
+            return await self.redis.get(key)
+        except RedisError as e:
+            self.errors += 1
+            logging.warning(f"Response cache read failed: {e}")
+            return None
+
+    async def _set(self, key: str, value: bytes, ttl: int) -> None:
+        try:
+            await self.redis.set(key, value, ex=ttl)
+        except RedisError as e:
+            self.errors += 1
+            logging.warning(f"Response cache write failed: {e}")
+
+    async def fetch(
+            self,
+            endpoint: str,
+            testnet: bool,
+            call: Callable[[], Awaitable[BaseModel]],
+            *args,
+            **kwargs,
+    ) -> any:
+        """
+        Serve an endpoint call from the cache, or run it and cache the result.
+
+        :param endpoint: The "<group>.<method>" name of the call.
+        :param testnet: Whether the call targets the testnet.
+        :param call: Coroutine factory performing the upstream request.
+        :return: The (possibly cached) response model.
+        :raises TONAPINotFoundError: If the entity is (known to be) missing.
+        """
+        policy = self.POLICIES.get(endpoint)
+        if policy is None:
+            return await call()
+
+        key = self.key(endpoint, testnet, args, kwargs)
+        raw = await self._get(key)
+        if raw == self.NOT_FOUND:
+            self.negative_hits += 1
+            raise TONAPICachedNotFoundError(endpoint)
+        if raw is not None:
+            self.hits += 1
+            return hydrate(policy.model, self.decode(raw))
+
+        self.misses += 1
+        try:
+            result = await call()
+        except TONAPINotFoundError:
+            await self._set(key, self.NOT_FOUND, policy.negative_ttl)
+            raise
+        await self._set(key, self.encode(result), policy.ttl)
+        return result
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+        }
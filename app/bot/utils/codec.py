@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+class StateCodec:
+    """
+    Binary encoding of FSM data.
+
+    Every value starts with a header byte: ``0x80 | format``, plus ``0x40`` when the payload
+    is zlib-compressed, which happens for payloads above ``threshold`` bytes. Values written
+    by the plain JSON storage start with ``{`` and are still decoded, so existing keys
+    migrate transparently on their next write.
+    """
+    JSON = 0x01
+    ORJSON = 0x02
+    MSGPACK = 0x03
+
+    FLAG = 0x80
+    COMPRESSED = 0x40
+
+    FORMATS = {"json": JSON, "orjson": ORJSON, "msgpack": MSGPACK}
+
+    def __init__(self, format: str = "orjson", threshold: int | None = 1024, level: int = 1) -> None:
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown FSM codec: {format}")
+        if format == "orjson" and orjson is None or format == "msgpack" and msgpack is None:
+            raise RuntimeError(f"FSM codec {format!r} is not installed")
+
+        self.format = self.FORMATS[format]
+        self.threshold = threshold
+        self.level = level
+
+    def _dumps(self, data: dict) -> tuple[int, bytes]:
+        if self.format == self.ORJSON:
+            try:
+                return self.ORJSON, orjson.dumps(data)
+            except TypeError:
+                # Integers beyond 64 bits, non-string keys
+                pass
+        elif self.format == self.MSGPACK:
+            try:
+                return self.MSGPACK, msgpack.packb(data)
+            except (TypeError, OverflowError):
+                pass
+        return self.JSON, json.dumps(data, separators=(",", ":")).encode()
+
+    def encode(self, data: dict) -> bytes:
+        format, payload = self._dumps(data)
+        if self.threshold is not None and len(payload) > self.threshold:
+            return bytes((self.FLAG | self.COMPRESSED | format,)) + zlib.compress(payload, self.level)
+        return bytes((self.FLAG | format,)) + payload
+
+    def decode(self, raw: bytes) -> dict:
+        header = raw[0]
+        if not header & self.FLAG:
+            return json.loads(raw)
+
+        payload = raw[1:]
+        if header & self.COMPRESSED:
+            payload = zlib.decompress(payload)
+
+        format = header & 0x3F
+        if format == self.ORJSON:
+            return orjson.loads(payload)
+        if format == self.MSGPACK:
+            return msgpack.unpackb(payload)
+        return json.loads(payload)
+
+    @classmethod
+    def is_legacy(cls, raw: bytes) -> bool:
+        return not raw[0] & cls.FLAG
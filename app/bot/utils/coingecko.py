@@ -2,21 +2,82 @@ from __future__ import annotations
 
 import asyncio
 import json
+import logging
+import os
+import time
+from contextlib import suppress
+from dataclasses import dataclass
 
 import aiofiles
 import aiohttp
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
+from .election import LeaderLease
 from ..data import BASE_DIR
 
 
-class Coingecko:
+@dataclass
+class PriceHolder:
+    """
+    Process-wide holder of the latest TON price.
+
+    Renderers read it synchronously, :class:`Coingecko` refreshes it in the background.
+    """
+    currency: Currency | None = None
+    updated_at: float = 0.0
+
+    def update(self, currency: Currency, updated_at: float | None = None) -> None:
+        self.currency = currency
+        self.updated_at = updated_at or time.time()
+
+    @property
+    def usd(self) -> float:
+        if self.currency and self.currency.ton and self.currency.ton.usd:
+            return float(self.currency.ton.usd)
+        return 0.0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.updated_at
+
+    def is_stale(self, max_age: float = 60.0) -> bool:
+        return self.currency is None or self.age > max_age
+
+
+PRICE = PriceHolder()
+
 
-    def __init__(self, filename: str = f"{BASE_DIR}/ton_price.json") -> None:
+class Coingecko:
+    LEADER_KEY = "coingecko:leader"
+    PRICE_KEY = "coingecko:price"
+    PRICE_CHANNEL = "coingecko:price"
+
+    MAX_BACKOFF = 300
+
+    def __init__(
+            self,
+            redis: Redis | None = None,
+            filename: str = f"{BASE_DIR}/ton_price.json",
+    ) -> None:
+        self.redis = redis
         self.filename = filename
 
-    @staticmethod
-    async def get_price() -> str | None:
+        self._failures = 0
+        self._session: aiohttp.ClientSession | None = None
+        self._lease: LeaderLease | None = None
+        self._subscriber: asyncio.Task | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
+        return self._session
+
+    async def get_price(self) -> str | None:
         """
         Retrieves the price of "the-open-network" in USD from the Coingecko API.
 
@@ -26,36 +87,143 @@ class Coingecko:
         url = "https://api.coingecko.com/api/v3/simple/price"
         params = {'ids': "the-open-network", 'vs_currencies': "usd"}
 
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(url, params=params)
-            return await response.text() if response.status == 200 else None
+        try:
+            async with self.session.get(url, params=params) as response:
+                return await response.text() if response.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning(f"Coingecko request failed: {e}")
+            return None
 
-    async def update_price(self) -> None:
+    async def load(self) -> None:
         """
-        Update the price by retrieving it from an external source and writing it to a file.
+        Warm the in-memory price from the cluster-wide key or the last local snapshot.
+        """
+        if self.redis:
+            with suppress(RedisError, ValueError):
+                price = await self.redis.get(self.PRICE_KEY)
+                if price:
+                    PRICE.update(Currency(**json.loads(price)))
+                    return
+
+        with suppress(FileNotFoundError, ValueError):
+            async with aiofiles.open(self.filename, "r") as f:
+                currency = Currency(**json.loads(await f.read()))
+            PRICE.update(currency, os.path.getmtime(self.filename))
+
+    async def update_price(self) -> bool:
+        """
+        Update the price by retrieving it from an external source,
+        refreshing the in-memory holder and publishing it to the other replicas.
+
+        Returns:
+            bool: True if the price was updated.
         """
         price = await self.get_price()
-        if not price: return  # noqa:E701
+        if not price: return False  # noqa:E701
+        try:
+            PRICE.update(Currency(**json.loads(price)))
+        except (json.JSONDecodeError, ValidationError) as e:
+            logging.warning(f"Coingecko returned an unexpected price: {e}")
+            return False
+
+        if self.redis:
+            with suppress(RedisError):
+                await self.redis.set(self.PRICE_KEY, price)
+                await self.redis.publish(self.PRICE_CHANNEL, price)
+
         async with aiofiles.open(self.filename, "w+") as f:
             await f.write(price)
+        return True
+
+    async def _subscribe(self) -> None:
+        """
+        Listen for prices published by the leader and apply them to the in-memory holder.
+        """
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.PRICE_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        with suppress(ValueError):
+                            PRICE.update(Currency(**json.loads(message["data"])))
+            except RedisError as e:
+                logging.warning(f"Coingecko subscriber disconnected: {e}")
+                await asyncio.sleep(5)
+
+    async def _poll(self, seconds: int) -> float:
+        """
+        Poll the upstream API once and compute the delay before the next poll,
+        backing off exponentially while requests keep failing.
+        """
+        if await self.update_price():
+            self._failures = 0
+            return seconds
+        self._failures += 1
+        return min(seconds * 2 ** self._failures, self.MAX_BACKOFF)
+
+    async def _sleep(self, delay: float, seconds: int) -> None:
+        """
+        Sleep between polls, renewing the lease every ``seconds`` meanwhile,
+        so a leader backing off for longer than the lease TTL stays the leader.
+        """
+        deadline = time.monotonic() + delay
+        while (remaining := deadline - time.monotonic()) > 0:
+            await asyncio.sleep(min(remaining, seconds))
+            if self._lease.is_leader and time.monotonic() < deadline:
+                try:
+                    await self._lease.acquire()
+                except RedisError as e:
+                    logging.warning(f"Coingecko leader lease renewal failed: {e}")
 
     async def run_updates(self, seconds: int = 10) -> None:
         """
         Run updates at regular intervals.
 
+        With Redis available, only the elected leader polls Coingecko, the other
+        replicas receive prices through pub/sub and take over if the leader dies.
+
         Args:
             seconds (int): The number of seconds to wait between updates. Defaults to 10.
         """
+        if not self.redis:
+            while True:
+                await asyncio.sleep(await self._poll(seconds))
+
+        self._lease = LeaderLease(self.redis, self.LEADER_KEY, ttl=seconds * 3)
+        self._subscriber = asyncio.create_task(self._subscribe())
+
         while True:
-            await self.update_price()
-            await asyncio.sleep(seconds)
+            delay = seconds
+            try:
+                if await self._lease.acquire():
+                    delay = await self._poll(seconds)
+                elif PRICE.is_stale(seconds * 6):
+                    await self.load()
+            except RedisError as e:
+                logging.warning(f"Coingecko leader election failed: {e}")
+                delay = await self._poll(seconds)
+            await self._sleep(delay, seconds)
+
+    async def close(self) -> None:
+        """
+        Stop listening for prices, release the leadership and close the HTTP session.
+        """
+        if self._subscriber:
+            self._subscriber.cancel()
+        if self._lease:
+            with suppress(RedisError):
+                await self._lease.release()
+        if self._session:
+            await self._session.close()
 
-    async def get(self) -> Currency:
+    @staticmethod
+    def get() -> Currency | None:
         """
-        Get the currency data from the specified file.
+        Get the latest currency data from memory, without any I/O.
         """
-        async with aiofiles.open(self.filename, "r") as f:
-            return Currency(**json.loads(await f.read()))
+        return PRICE.currency
 
 
 class Price(BaseModel):
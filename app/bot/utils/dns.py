@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from pytonapi.exceptions import TONAPINotFoundError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from .tonapi import TonapiClient
+from ..exceptions import TONAPICachedNotFoundError
+
+_testnet: ContextVar[bool] = ContextVar("dns_testnet", default=False)
+
+
+def is_domain(text: str) -> bool:
+    return text[-4:] == ".ton" or text[-5:] == ".t.me"
+
+
+class DNSCache:
+    """
+    Cache of `.ton` / `.t.me` domain resolutions with a reverse index.
+
+    Resolutions live in an in-process LRU backed by Redis, both honoring the TTL.
+    Every domain seen by this process is also indexed by its network and wallet
+    address, so an address can be displayed under its domain without any extra request.
+    """
+    NOT_FOUND = ""
+
+    def __init__(self, redis: Redis | None = None, ttl: int = 600, negative_ttl: int = 30,
+                 max_size: int = 50_000) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+        self._domains: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._reverse: dict[tuple[bool, str], set[str]] = {}
+
+    def setup(self, redis: Redis, ttl: int) -> None:
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def use_network(testnet: bool) -> None:
+        """
+        Set the network whose domains :meth:`domain` returns for the current update.
+        """
+        _testnet.set(testnet)
+
+    @staticmethod
+    def _key(testnet: bool, domain: str) -> str:
+        return f"dns:{'testnet' if testnet else 'mainnet'}:{domain}"
+
+    def _remember(self, key: str, domain: str, address: str, ttl: int) -> None:
+        previous = self._domains.get(key)
+        if previous is not None and previous[0] != address:
+            self._forget(key, previous[0])
+        self._domains[key] = address, time.monotonic() + ttl
+        self._domains.move_to_end(key)
+        if address:
+            testnet = key.split(":", 2)[1] == "testnet"
+            self._reverse.setdefault((testnet, address), set()).add(domain)
+
+        while len(self._domains) > self.max_size:
+            old_key, (old_address, _) = self._domains.popitem(last=False)
+            self._forget(old_key, old_address)
+
+    def _forget(self, key: str, address: str) -> None:
+        _, network, domain = key.split(":", 2)
+        reverse_key = network == "testnet", address
+        domains = self._reverse.get(reverse_key)
+        if domains is None:
+            return
+        domains.discard(domain)
+        if not domains:
+            del self._reverse[reverse_key]
+
+    def _get_local(self, key: str) -> str | None:
+        cached = self._domains.get(key)
+        if cached is None:
+            return None
+        address, expires_at = cached
+        if expires_at < time.monotonic():
+            del self._domains[key]
+            self._forget(key, address)
+            return None
+        self._domains.move_to_end(key)
+        return address
+
+    async def _get_redis(self, key: str) -> tuple[str, int] | None:
+        if not self.redis:
+            return None
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                address, ttl = await pipe.get(key).ttl(key).execute()
+        except RedisError as e:
+            logging.warning(f"DNS cache read failed: {e}")
+            return None
+        if address is None or ttl <= 0:
+            return None
+        return address.decode(), ttl
+
+    async def _set_redis(self, key: str, address: str, ttl: int) -> None:
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(key, address, ex=ttl)
+        except RedisError as e:
+            logging.warning(f"DNS cache write failed: {e}")
+
+    async def resolve(self, tonapi: TonapiClient, domain: str) -> str:
+        """
+        Resolve a domain into the user-friendly address of its wallet.
+
+        :param tonapi: The client to make requests with.
+        :param domain: The `.ton` or `.t.me` domain.
+        :return: The wallet address.
+        :raises TONAPINotFoundError: If the domain (is known to) have no wallet.
+        """
+        domain = domain.lower()
+        key = self._key(tonapi.testnet, domain)
+
+        address = self._get_local(key)
+        if address is None:
+            cached = await self._get_redis(key)
+            if cached is not None:
+                self.redis_hits += 1
+                address, ttl = cached
+                self._remember(key, domain, address, ttl)
+        else:
+            self.hits += 1
+
+        if address is None:
+            self.misses += 1
+            try:
+                request = await tonapi.dns.resolve(domain)
+                address = request.wallet.address.to_userfriendly() if request.wallet else self.NOT_FOUND
+            except TONAPINotFoundError:
+                address = self.NOT_FOUND
+            ttl = self.ttl if address else self.negative_ttl
+            self._remember(key, domain, address, ttl)
+            await self._set_redis(key, address, ttl)
+
+        if address == self.NOT_FOUND:
+            raise TONAPICachedNotFoundError("dns.resolve")
+        return address
+
+    def domain(self, address: str) -> str | None:
+        """
+        Return a domain known to point at the address, without any request.
+
+        :param address: The user-friendly address, on the network of the current update.
+        :return: The shortest known domain that has not expired, or None.
+        """
+        testnet = _testnet.get()
+        domains = self._reverse.get((testnet, address))
+        if not domains:
+            return None
+        # Expired resolutions are dropped from the index on the way.
+        current = [domain for domain in list(domains) if self._get_local(self._key(testnet, domain)) == address]
+        return min(current, key=lambda d: (len(d), d)) if current else None
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "domains": len(self._domains),
+            "addresses": len(self._reverse),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
+
+
+DNS = DNSCache()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+import socket
+
+from redis.asyncio import Redis
+
+
+class LeaderLease:
+    """
+    Redis-based leader election using a single expiring key.
+
+    The replica that manages to ``SET NX`` the key becomes the leader and keeps
+    renewing it. If the leader dies, the key expires and another replica takes over.
+    """
+
+    _RENEW_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) "
+        "else return 0 end"
+    )
+    _RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) "
+        "else return 0 end"
+    )
+
+    def __init__(self, redis: Redis, key: str, ttl: float = 30.0, identity: str | None = None) -> None:
+        self.redis = redis
+        self.key = key
+        self.ttl = ttl
+        self.identity = identity or f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+
+    async def acquire(self) -> bool:
+        """
+        Acquire the lease or renew it if this replica already holds it.
+
+        :return: True if this replica is the leader after the call.
+        """
+        ttl_ms = int(self.ttl * 1000)
+        if self.is_leader:
+            renewed = await self.redis.eval(self._RENEW_SCRIPT, 1, self.key, self.identity, ttl_ms)
+            self.is_leader = bool(renewed)
+        if not self.is_leader:
+            acquired = await self.redis.set(self.key, self.identity, nx=True, px=ttl_ms)
+            self.is_leader = bool(acquired)
+        return self.is_leader
+
+    async def release(self) -> None:
+        """
+        Release the lease so another replica can take over without waiting for expiry.
+        """
+        if self.is_leader:
+            await self.redis.eval(self._RELEASE_SCRIPT, 1, self.key, self.identity)
+            self.is_leader = False
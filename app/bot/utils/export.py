@@ -9,6 +9,8 @@ import aiofiles
 from aiocsv import AsyncDictWriter
 from pytonapi.schema.events import AccountEvents
 
+from .history import PriceHistory
+
 
 @dataclass
 class EventRow:
@@ -22,6 +24,8 @@ class EventRow:
     comment: Optional[str] = None
     first_account_address: Optional[str] = None
     second_account_address: Optional[str] = None
+    ton_usd_price: Optional[float] = None
+    value_usd: Optional[float] = None
 
     def to_dict(self) -> dict:
         return asdict(self)
@@ -37,9 +41,10 @@ class EventRows:
 
 class ExportManager:
 
-    def __init__(self, events: AccountEvents) -> None:
+    def __init__(self, events: AccountEvents, history: PriceHistory | None = None) -> None:
         self.rows = []
         self.events = events
+        self.history = history
         self.buffer = BytesIO()
 
     def _create_rows(self) -> EventRows:
@@ -71,6 +76,11 @@ class ExportManager:
                 row.first_account_address = event.actions[0].simple_preview.accounts[0].address.to_userfriendly()
             if len(event.actions[0].simple_preview.accounts) == 2:
                 row.second_account_address = event.actions[0].simple_preview.accounts[1].address.to_userfriendly()
+            if self.history:
+                row.ton_usd_price = round(self.history.price_at(event.timestamp), 6)
+                if event.actions[0].TonTransfer:
+                    amount = float(event.actions[0].simple_preview.value.split(" ")[0].replace(",", ""))
+                    row.value_usd = round(amount * row.ton_usd_price, 2)
             self.rows.append(row)
 
         return EventRows(rows=self.rows)
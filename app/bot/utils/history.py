@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import struct
+import time
+from array import array
+from contextlib import suppress
+
+import aiofiles
+import aiohttp
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from .coingecko import PRICE
+from .election import LeaderLease
+from ..data import BASE_DIR
+
+SECONDS_PER_DAY = 86400
+
+
+class PriceHistory:
+    """
+    Local time-series store of daily TON/USD prices.
+
+    On disk the store is a small header followed by a fixed-width float32 array,
+    one slot per day, so the price of any day lives at ``HEADER.size + index * 4``.
+    The whole array is kept in memory for lookups (a few KB per decade).
+
+    With Redis available, only the elected leader backfills from Coingecko and
+    publishes the store, the other replicas and workers pull it from Redis.
+    """
+    MAGIC = b"TONP"
+    HEADER = struct.Struct("<4sI")  # magic, first day (days since the epoch)
+
+    LEADER_KEY = "history:leader"
+    HISTORY_KEY = "history:ton"
+
+    def __init__(self, filename: str = f"{BASE_DIR}/ton_history.bin", redis: Redis | None = None) -> None:
+        self.filename = filename
+        self.redis = redis
+        self.start_day = 0
+        self.prices = array("f")
+
+    def setup(self, redis: Redis) -> None:
+        self.redis = redis
+
+    @property
+    def end_day(self) -> int:
+        return self.start_day + len(self.prices)
+
+    def price_at(self, timestamp: float) -> float:
+        """
+        Get the TON/USD price for the day of the given timestamp.
+
+        Falls back to the current price for days the store does not cover yet.
+
+        :param timestamp: Unix timestamp in seconds.
+        :return: The price in USD.
+        """
+        index = int(timestamp // SECONDS_PER_DAY) - self.start_day
+        if 0 <= index < len(self.prices) and self.prices[index] > 0:
+            return float(self.prices[index])
+        return PRICE.usd
+
+    def encode(self) -> bytes:
+        return self.HEADER.pack(self.MAGIC, self.start_day) + self.prices.tobytes()
+
+    def decode(self, content: bytes, source: str) -> tuple[int, array] | None:
+        """
+        Decode a stored store, or return None if it is not valid.
+
+        :param content: The encoded store.
+        :param source: Where it was read from, for the logs.
+        :return: The first day and the prices.
+        """
+        if len(content) < self.HEADER.size:
+            return None
+        magic, start_day = self.HEADER.unpack_from(content)
+        if magic != self.MAGIC:
+            logging.warning(f"Unknown price history format in {source}")
+            return None
+        prices = array("f")
+        try:
+            prices.frombytes(content[self.HEADER.size:])
+        except ValueError:
+            logging.warning(f"Truncated price history in {source}")
+            return None
+        return start_day, prices
+
+    async def load(self) -> None:
+        """
+        Load the store from the file, if it exists and is valid.
+
+        An invalid file is treated as no history, and is replaced by the next backfill.
+        """
+        with suppress(FileNotFoundError):
+            async with aiofiles.open(self.filename, "rb") as f:
+                content = await f.read()
+            decoded = self.decode(content, self.filename)
+            if decoded:
+                self.start_day, self.prices = decoded
+
+    async def save(self) -> None:
+        """
+        Atomically write the store to the file.
+        """
+        # Per process, as the workers of a host share the file.
+        tmp = f"{self.filename}.{os.getpid()}.tmp"
+        async with aiofiles.open(tmp, "wb") as f:
+            await f.write(self.encode())
+        os.replace(tmp, self.filename)
+
+    def merge(self, points: list[tuple[float, float]]) -> None:
+        """
+        Merge (timestamp, price) points into the store, forward-filling missing days.
+
+        :param points: Daily points as returned by the Coingecko market chart.
+        """
+        daily = {int(ts // SECONDS_PER_DAY): price for ts, price in points if price}
+        if not daily:
+            return
+
+        start_day = min(daily) if not self.prices else min(self.start_day, min(daily))
+        end_day = max(self.end_day, max(daily) + 1)
+
+        prices = array("f", [0.0]) * (end_day - start_day)
+        if self.prices:
+            offset = self.start_day - start_day
+            prices[offset:offset + len(self.prices)] = self.prices
+        for day, price in daily.items():
+            prices[day - start_day] = price
+        for index in range(1, len(prices)):
+            if prices[index] <= 0:
+                prices[index] = prices[index - 1]
+
+        self.start_day, self.prices = start_day, prices
+
+    @staticmethod
+    async def fetch(days: int | str) -> list[tuple[float, float]]:
+        """
+        Retrieves daily TON/USD prices from the Coingecko market chart API.
+
+        :param days: Number of days back from today, or "max" for the full history.
+        :return: List of (timestamp in seconds, price) points.
+        """
+        url = "https://api.coingecko.com/api/v3/coins/the-open-network/market_chart"
+        params = {"vs_currency": "usd", "days": str(days), "interval": "daily"}
+
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            async with session.get(url, params=params) as response:
+                if response.status != 200:
+                    return []
+                content = await response.json()
+        return [(ms / 1000, price) for ms, price in content.get("prices", [])]
+
+    async def backfill(self) -> None:
+        """
+        Fetch the days missing from the store and persist it.
+        """
+        today = int(time.time() // SECONDS_PER_DAY)
+        days = "max" if not self.prices else max(today - self.end_day + 2, 2)
+
+        points = await self.fetch(days)
+        if not points:
+            return
+        self.merge(points)
+        await self.save()
+        if self.redis:
+            await self.redis.set(self.HISTORY_KEY, self.encode())
+
+    async def pull(self) -> None:
+        """
+        Take the store published by the leader, if it covers more days, and persist it.
+        """
+        content = await self.redis.get(self.HISTORY_KEY)
+        decoded = self.decode(content, self.HISTORY_KEY) if content else None
+        if decoded is None:
+            return
+        start_day, prices = decoded
+        if start_day + len(prices) > self.end_day:
+            self.start_day, self.prices = start_day, prices
+            await self.save()
+
+    async def run_backfill(self, seconds: int = 6 * 60 * 60) -> None:
+        """
+        Run the backfill job at regular intervals.
+
+        With Redis available, only the elected leader fetches from Coingecko,
+        the other replicas pull the store it publishes.
+
+        Args:
+            seconds (int): The number of seconds to wait between runs. Defaults to 6 hours.
+        """
+        lease = LeaderLease(self.redis, self.LEADER_KEY, ttl=seconds * 3) if self.redis else None
+
+        while True:
+            delay = seconds
+            try:
+                if lease is None or await lease.acquire():
+                    await self.backfill()
+                else:
+                    await self.pull()
+                    # Without any history yet, check again soon for the leader's first backfill.
+                    if not self.prices:
+                        delay = min(seconds, 60)
+            except RedisError as e:
+                logging.warning(f"Price history sync failed: {e}")
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logging.warning(f"Price history backfill failed: {e}")
+            await asyncio.sleep(delay)
+
+
+HISTORY = PriceHistory()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from pytonapi.schema.jettons import JettonInfo
+
+from .tonapi import TonapiClient
+
+
+@dataclass
+class Holder:
+    rank: int
+    address: str
+    balance: float
+    share: float
+
+
+@dataclass
+class HoldersIndex:
+    """
+    Holders of a jetton, ordered by balance, with balances (in jetton units)
+    and supply shares kept in flat arrays.
+    """
+    jetton: JettonInfo
+    addresses: list[str]
+    balances: array = field(default_factory=lambda: array("d"))
+    shares: array = field(default_factory=lambda: array("f"))
+    created_at: float = field(default_factory=time.monotonic)
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    @classmethod
+    def build(cls, jetton: JettonInfo, holders: list) -> HoldersIndex:
+        decimals = 10 ** int(jetton.metadata.decimals)
+        total_supply = int(jetton.total_supply or 0)
+
+        raw = sorted(((int(holder.balance), holder.address.to_userfriendly()) for holder in holders), reverse=True)
+        index = cls(jetton, [address for _, address in raw])
+        index.balances.extend(balance / decimals for balance, _ in raw)
+        index.shares.extend(balance / total_supply if total_supply else 0.0 for balance, _ in raw)
+        return index
+
+    def page(self, offset: int, limit: int) -> list[Holder]:
+        return [
+            Holder(i + 1, self.addresses[i], self.balances[i], self.shares[i])
+            for i in range(offset, min(offset + limit, len(self)))
+        ]
+
+
+class JettonHoldersCache:
+    """
+    Per-jetton holders indexes for inline "holders" scrolling.
+
+    An index is built from a single fetch of the jetton info and its holders, with ranks
+    and shares computed at ingest. The first page of an inline session rebuilds it when it
+    is older than ``refresh``, later pages use it for up to ``ttl``. The total number of
+    holders kept is capped at ``max_holders``, evicting the least recently used jettons.
+    """
+
+    def __init__(self, refresh: int = 60, ttl: int = 600, max_holders: int = 500_000) -> None:
+        self.refresh = refresh
+        self.ttl = ttl
+        self.max_holders = max_holders
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._size = 0
+        self._indexes: OrderedDict[tuple[str, bool], HoldersIndex] = OrderedDict()
+
+    def _get(self, key: tuple[str, bool], max_age: float) -> HoldersIndex | None:
+        index = self._indexes.get(key)
+        if index is None:
+            return None
+        if time.monotonic() - index.created_at > max_age:
+            self._drop(key)
+            return None
+        self._indexes.move_to_end(key)
+        return index
+
+    def _drop(self, key: tuple[str, bool]) -> None:
+        self._size -= len(self._indexes.pop(key))
+
+    def _put(self, key: tuple[str, bool], index: HoldersIndex) -> None:
+        if key in self._indexes:
+            self._drop(key)
+        self._indexes[key] = index
+        self._size += len(index)
+        while self._size > self.max_holders and len(self._indexes) > 1:
+            self._drop(next(iter(self._indexes)))
+            self.evictions += 1
+
+    async def get(self, tonapi: TonapiClient, account_id: str, offset: int = 0) -> HoldersIndex:
+        """
+        Return the holders index of a jetton.
+
+        :param tonapi: The client to make requests with.
+        :param account_id: The jetton master address.
+        :param offset: The inline offset, 0 starts a new session.
+        :return: The :class:`HoldersIndex`.
+        """
+        key = account_id, tonapi.testnet
+        index = self._get(key, self.ttl if offset else self.refresh)
+
+        if index is None:
+            self.misses += 1
+            jetton, holders = await asyncio.gather(
+                tonapi.jettons.get_info(account_id=account_id),
+                tonapi.jettons.get_holders(account_id=account_id),
+            )
+            index = HoldersIndex.build(jetton, holders.addresses)
+            self._put(key, index)
+        else:
+            self.hits += 1
+
+        return index
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "jettons": len(self._indexes),
+            "holders": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
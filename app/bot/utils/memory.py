@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+
+
+@dataclass
+class KeyUsage:
+    keys: int = 0
+    bytes: int = 0
+    persistent: int = 0
+
+
+def category(key: str) -> str:
+    """
+    The category of a Redis key: its first segment, and for FSM keys
+    (``fsm:{chat}:{user}:{suffix}``) also the suffix.
+    """
+    prefix, _, rest = key.partition(":")
+    if prefix == "fsm":
+        return f"fsm:{rest.rpartition(':')[2]}"
+    return prefix
+
+
+async def memory_report(redis: Redis, batch: int = 500) -> dict[str, KeyUsage]:
+    """
+    Count the keys of every category with their memory usage.
+
+    :param redis: The Redis client to scan.
+    :param batch: The number of keys scanned and measured per round trip.
+    :return: The usage by category, largest first.
+    """
+    report: dict[str, KeyUsage] = {}
+    cursor = 0
+    while True:
+        cursor, keys = await redis.scan(cursor, count=batch)
+        if keys:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.memory_usage(key)
+                    pipe.ttl(key)
+                results = await pipe.execute()
+
+            for i, key in enumerate(keys):
+                size, ttl = results[2 * i], results[2 * i + 1]
+                usage = report.setdefault(category(key.decode() if isinstance(key, bytes) else key), KeyUsage())
+                usage.keys += 1
+                usage.bytes += size or 0
+                usage.persistent += ttl == -1
+        if cursor == 0:
+            break
+    return dict(sorted(report.items(), key=lambda item: item[1].bytes, reverse=True))
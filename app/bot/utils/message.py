@@ -1,3 +1,4 @@
+import hashlib
 from contextlib import suppress
 
 from aiogram import Bot
@@ -6,6 +7,47 @@ from aiogram.types import Message, InlineKeyboardMarkup
 from aiogram.utils.exceptions import (MessageCantBeDeleted, MessageToDeleteNotFound,
                                       MessageToEditNotFound, MessageCantBeEdited, MessageNotModified, BadRequest)
 
+from .storage import BufferedRedisStorage
+
+
+class RenderedDigests:
+    """
+    Digest of the text and markup last rendered into the user's message,
+    to skip edits that would not change anything.
+
+    The digest is kept in the FSM data (``rendered``: message ID and digest), so it is
+    shared by every worker and replica serving the user. It is only checked while a
+    state buffer is active, where reading and writing it costs no extra round trip,
+    and is only written once the message shows the content.
+    """
+    KEY = "rendered"
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(text: str, markup: InlineKeyboardMarkup | None) -> str:
+        content = text + "\0" + (markup.as_json() if markup else "")
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def is_current(self, data: dict, message_id: int, digest: str) -> bool:
+        if data.get(self.KEY) == [message_id, digest]:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+RENDERED = RenderedDigests()
+
 
 async def delete_message(message: Message) -> None:
     """
@@ -48,8 +90,13 @@ async def edit_or_send_message(bot: Bot, state: FSMContext,
     :param message_id: The ID of the message to be edited.
     :param text: The text of the message.
     :param markup: The inline keyboard markup for the message (default: None).
-    :return: Message | None: The edited or sent message, or None if an error occurred.
+    :return: Message | None: The edited or sent message, or None if the message already shows the text and markup.
     """
+    buffered = BufferedRedisStorage.buffered()
+    digest = RENDERED.digest(text, markup)
+    if buffered and RENDERED.is_current(await state.get_data(), message_id, digest):
+        return None
+
     try:
         message = await bot.edit_message_text(
             text=text, chat_id=chat_id,
@@ -61,6 +108,19 @@ async def edit_or_send_message(bot: Bot, state: FSMContext,
             chat_id=chat_id, text=text, reply_markup=markup
         )
         await delete_previous_message(bot=bot, state=state)
-        await state.update_data(message_id=message.message_id)
+        if buffered:
+            await state.update_data({RENDERED.KEY: [message.message_id, digest]}, message_id=message.message_id)
+        else:
+            await state.update_data(message_id=message.message_id)
+
+    except Exception:
+        # The edit may still have reached the message, so the digest can no longer be trusted.
+        if buffered:
+            await state.update_data({RENDERED.KEY: None})
+        raise
+
+    else:
+        if buffered:
+            await state.update_data({RENDERED.KEY: [message_id, digest]})
 
     return message
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import typing
+from collections import OrderedDict
+from enum import Enum
+
+from pydantic.v1 import BaseModel
+from pydantic.v1.fields import ModelField, SHAPE_SINGLETON, SHAPE_LIST, SHAPE_SEQUENCE, SHAPE_DICT, SHAPE_MAPPING
+
+M = typing.TypeVar("M", bound=BaseModel)
+
+
+class _Untrusted(Exception):
+    pass
+
+
+# Leaf types that a JSON round trip of ``.dict()`` returns as they are.
+JSON_TYPES = (str, int, float, bool, dict, list)
+
+
+def _construct_value(field: ModelField, value: typing.Any) -> typing.Any:
+    if value is None:
+        return None
+
+    if field.shape in (SHAPE_LIST, SHAPE_SEQUENCE):
+        return [_construct_value(field.sub_fields[0], item) for item in value]
+    if field.shape in (SHAPE_DICT, SHAPE_MAPPING):
+        return {key: _construct_value(field.sub_fields[0], item) for key, item in value.items()}
+    if field.shape != SHAPE_SINGLETON or field.sub_fields:
+        # Tuples, sets and unions: the type of the value is not known without validation.
+        raise _Untrusted(field.name)
+
+    type_ = field.type_
+    if not isinstance(type_, type):
+        return value
+    if issubclass(type_, BaseModel):
+        return construct(type_, value)
+    if issubclass(type_, JSON_TYPES) and not issubclass(type_, Enum):
+        return value
+    raise _Untrusted(field.name)
+
+
+def construct(model: type[M], data: typing.Any) -> M:
+    """
+    Build a model from its own ``.dict()`` output without validating it.
+
+    Nested models are built recursively; custom root models (addresses, balances)
+    are dumped as their root value and are wrapped back.
+
+    :raises _Untrusted: If a field can not be built without validation.
+    """
+    if model.__custom_root_type__:
+        data = {"__root__": data}
+    values = {}
+    for name, field in model.__fields__.items():
+        if name in data:
+            values[name] = _construct_value(field, data[name])
+        elif field.alias in data:
+            values[name] = _construct_value(field, data[field.alias])
+    return model.construct(**values)
+
+
+def hydrate(model: type[M], data: dict) -> M:
+    """
+    Build a model from data the bot serialized itself, validating it only
+    when it can not be constructed directly.
+    """
+    try:
+        return construct(model, data)
+    except _Untrusted:
+        return model(**data)
+
+
+def digest(data: dict) -> str:
+    return hashlib.blake2b(json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode(),
+                           digest_size=16).hexdigest()
+
+
+class ModelCache:
+    """
+    In-process LRU of the view models kept in FSM data.
+
+    :meth:`dump` stores a model as its ``.dict()`` together with a digest of the content
+    (``<name>_digest``). :meth:`load` returns the hydrated model for that digest when it
+    is cached, and otherwise builds it without validation, since the data was serialized
+    by the bot itself. Data stored without a digest is validated as before.
+
+    Cached models are shared between renders and must not be modified.
+    """
+
+    def __init__(self, max_size: int = 2048) -> None:
+        self.max_size = max_size
+        self._models: OrderedDict[tuple[type, str], BaseModel] = OrderedDict()
+
+        self.hits = 0
+        self.constructed = 0
+        self.validated = 0
+
+    @staticmethod
+    def digest_key(name: str) -> str:
+        return f"{name}_digest"
+
+    def _put(self, key: tuple[type, str], model: BaseModel) -> None:
+        self._models[key] = model
+        self._models.move_to_end(key)
+        while len(self._models) > self.max_size:
+            self._models.popitem(last=False)
+
+    def dump(self, **models: BaseModel) -> dict:
+        """
+        Get the FSM data fields for the models and cache them.
+
+        :param models: The models by their data field name.
+        :return: The fields to update the FSM data with.
+        """
+        fields = {}
+        for name, model in models.items():
+            data = model.dict()
+            key = digest(data)
+            self._put((type(model), key), model)
+            fields[name] = data
+            fields[self.digest_key(name)] = key
+        return fields
+
+    def load(self, data: dict, name: str, model: type[M]) -> M:
+        """
+        Get the model stored in a FSM data field.
+
+        :param data: The FSM data.
+        :param name: The data field of the model.
+        :param model: The class of the model.
+        :return: The model.
+        """
+        key = data.get(self.digest_key(name))
+        if key is None:
+            self.validated += 1
+            return model(**data[name])
+
+        cached = self._models.get((model, key))
+        if cached is not None:
+            self.hits += 1
+            self._models.move_to_end((model, key))
+            return cached
+
+        self.constructed += 1
+        result = hydrate(model, data[name])
+        self._put((model, key), result)
+        return result
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": len(self._models),
+            "hits": self.hits,
+            "constructed": self.constructed,
+            "validated": self.validated,
+        }
+
+
+MODELS = ModelCache()
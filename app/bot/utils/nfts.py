@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+
+from pytonapi.schema.events import AccountEvent
+from pytonapi.schema.nft import NftItem
+
+from .tonapi import TonapiClient
+
+
+class NftCache:
+    """
+    Process-level cache of NFT items by raw address, used to enrich event feeds.
+
+    Transfers of an event page are indexed by NFT address, only the items that are
+    not cached are requested in one bulk call, and every transfer is filled in
+    with a dictionary lookup.
+    """
+
+    def __init__(self, ttl: int = 3600, max_size: int = 20_000) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._items: OrderedDict[tuple[str, bool], tuple[NftItem, float]] = OrderedDict()
+
+    def get(self, address: str, testnet: bool) -> NftItem | None:
+        key = address, testnet
+        cached = self._items.get(key)
+        if cached is None:
+            return None
+        item, expires_at = cached
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return item
+
+    def put(self, item: NftItem, testnet: bool) -> None:
+        key = item.address.to_raw(), testnet
+        self._items[key] = item, time.monotonic() + self.ttl
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    async def enrich(self, tonapi: TonapiClient, events: list[AccountEvent]) -> None:
+        """
+        Replace the NFT addresses of the events' NFT transfers with their items.
+
+        :param tonapi: The client to make requests with.
+        :param events: The events to enrich in place.
+        """
+        transfers: dict[str, list] = {}
+        for event in events:
+            transfer = event.actions[0].NftItemTransfer
+            if transfer and isinstance(transfer.nft, str):
+                transfers.setdefault(transfer.nft, []).append(transfer)
+        if not transfers:
+            return
+
+        items = {address: self.get(address, tonapi.testnet) for address in transfers}
+        missing = [address for address, item in items.items() if item is None]
+        self.hits += len(items) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            search = await tonapi.nft.get_bulk_items(missing)
+            for item in search.nft_items:
+                self.put(item, tonapi.testnet)
+                items[item.address.to_raw()] = item
+
+        for address, group in transfers.items():
+            if item := items.get(address):
+                for transfer in group:
+                    transfer.nft = item
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "items": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
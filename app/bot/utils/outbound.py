@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.utils.exceptions import RetryAfter
+
+from .scheduler import FairScheduler, Priority, TokenBucket
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar("outbound_priority",
+                                                                     default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def outbound_priority(priority: Priority):
+    """
+    Send the Telegram requests made inside the block through the given lane.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# Result given to the callers of replaced edits that were never sent.
+_RESEND = object()
+
+
+@dataclass
+class _PendingEdit:
+    data: dict
+    superseded: list[asyncio.Future] = field(default_factory=list)
+
+    def resolve(self, result: any = None, exception: BaseException | None = None) -> None:
+        for future in self.superseded:
+            if future.done():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+
+class OutboundScheduler(FairScheduler):
+    """
+    Scheduler for the requests the bot makes to the Telegram API.
+
+    On top of the global budget and the priority lanes of :class:`FairScheduler`,
+    messages to a chat are paced by a per-chat token bucket, as Telegram limits
+    both. Edits of the same message that are still waiting are collapsed: the
+    waiting request sends the latest payload, and the callers it replaced get its result.
+    """
+    # Requests that post to a chat and count against its limit.
+    PACED = frozenset({
+        "sendMessage", "sendDocument", "sendPhoto", "sendAnimation", "sendMediaGroup",
+        "copyMessage", "forwardMessage",
+        "editMessageText", "editMessageCaption", "editMessageMedia", "editMessageReplyMarkup",
+    })
+    # Requests that only count against the global budget.
+    GLOBAL = frozenset({
+        "answerCallbackQuery", "answerInlineQuery", "deleteMessage", "sendChatAction",
+    })
+    COALESCED = frozenset({
+        "editMessageText", "editMessageCaption", "editMessageReplyMarkup",
+    })
+
+    def __init__(
+            self,
+            rate: float = 30,
+            burst: int = 30,
+            chat_rate: float = 1,
+            chat_burst: int = 3,
+            group_rate: float = 20 / 60,
+            max_chats: int = 10_000,
+    ) -> None:
+        super().__init__(rate, burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_chats = max_chats
+
+        self._chats: OrderedDict[int, TokenBucket] = OrderedDict()
+        self._edits: dict[tuple, _PendingEdit] = {}
+
+        self.sent = 0
+        self.coalesced = 0
+        self.flood_waits = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = self.chat_rate if chat_id > 0 else self.group_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst)
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def _pace(self, method: str, chat_id: int | None) -> None:
+        if method in self.PACED and isinstance(chat_id, int):
+            delay = self._chat_bucket(chat_id).reserve()
+            if delay:
+                await asyncio.sleep(delay)
+        await self.acquire(chat_id or 0, _priority.get())
+
+    async def request(self, send, method: str, data: dict | None, files: dict | None, **kwargs) -> any:
+        """
+        Send a request once the budgets allow it.
+
+        :param send: Coroutine function making the request.
+        :param method: The Bot API method.
+        :param data: The parameters of the request.
+        :param files: The files of the request.
+        """
+        if method not in self.PACED and method not in self.GLOBAL:
+            return await send(method, data, files, **kwargs)
+
+        chat_id = (data or {}).get("chat_id")
+        key = (method, chat_id, (data or {}).get("message_id"))
+        if method not in self.COALESCED or key[2] is None:
+            await self._pace(method, chat_id)
+            return await self._send(send, method, data, files, **kwargs)
+
+        pending = self._edits.get(key)
+        if pending is not None:
+            # Replace the payload of the waiting edit and share its result.
+            self.coalesced += 1
+            pending.data = data
+            future = asyncio.get_running_loop().create_future()
+            pending.superseded.append(future)
+            result = await future
+            if result is _RESEND:
+                return await self.request(send, method, data, files, **kwargs)
+            return result
+
+        pending = self._edits[key] = _PendingEdit(data)
+        try:
+            try:
+                await self._pace(method, chat_id)
+            finally:
+                del self._edits[key]
+            result = await self._send(send, method, pending.data, files, **kwargs)
+        except asyncio.CancelledError:
+            # The replaced edits may not have been sent: their callers send them again.
+            pending.resolve(_RESEND)
+            raise
+        except Exception as e:
+            # The payload that failed was the latest caller's, so every caller
+            # sees the error and falls back with its own payload.
+            pending.resolve(exception=e)
+            raise
+        pending.resolve(result)
+        return result
+
+    async def _send(self, send, method: str, data: dict | None, files: dict | None, **kwargs) -> any:
+        try:
+            result = await send(method, data, files, **kwargs)
+        except RetryAfter as e:
+            # Telegram asks to back off: stop admitting requests, then retry once.
+            self.flood_waits += 1
+            logging.warning(f"Telegram flood wait of {e.timeout}s on {method}")
+            self.bucket.tokens = min(self.bucket.tokens, 0) - e.timeout * self.bucket.rate
+            await asyncio.sleep(e.timeout)
+            result = await send(method, data, files, **kwargs)
+        self.sent += 1
+        return result
+
+    @property
+    def stats(self) -> dict:
+        return {
+            **super().stats,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "flood_waits": self.flood_waits,
+            "chats": len(self._chats),
+        }
+
+
+class ScheduledBot(Bot):
+    """
+    :class:`Bot` whose requests go through the :class:`OutboundScheduler`
+    stored as ``bot["outbound"]``, once it is set up.
+    """
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        scheduler: OutboundScheduler | None = self.get("outbound")
+        if scheduler is None:
+            return await super().request(method, data, files, **kwargs)
+        return await scheduler.request(super().request, method, data, files, **kwargs)
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+import struct
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from .tonapi import TonapiClient
+from ..texts.buttons import create_event_button
+
+
+@dataclass
+class EventRow:
+    event_id: str
+    lt: int
+    label: str
+
+
+class EventPageStore:
+    """
+    Pages of an account's events for the events window, kept out of the FSM data.
+
+    A page is stored under (network, user, account, cursor), where the cursor is the ``before_lt``
+    the page was fetched with (0 for the first page), and only holds what the window
+    shows: the event ID, its logical time and the rendered button label, packed into
+    a compact binary record. Pages expire after ``ttl`` and are refetched on demand,
+    so the FSM only needs to keep the list of cursors. The first page holds the latest
+    events, so it is refetched whenever the window is opened. A cursor is only added
+    to the FSM once its page is known to hold events, see ``probe``.
+    """
+    ROW = struct.Struct("<32sQH")
+
+    def __init__(self, redis: Redis, ttl: int = 3600, page_size: int = 10) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.page_size = page_size
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(testnet: bool, user_id: int, account_id: str, cursor: int) -> str:
+        return f"pages:{'testnet' if testnet else 'mainnet'}:{user_id}:{account_id}:{cursor}"
+
+    @classmethod
+    def encode(cls, rows: list[EventRow]) -> bytes:
+        chunks = []
+        for row in rows:
+            label = row.label.encode()
+            chunks.append(cls.ROW.pack(bytes.fromhex(row.event_id), row.lt, len(label)))
+            chunks.append(label)
+        return b"".join(chunks)
+
+    @classmethod
+    def decode(cls, raw: bytes) -> list[EventRow]:
+        rows, offset = [], 0
+        while offset < len(raw):
+            event_id, lt, size = cls.ROW.unpack_from(raw, offset)
+            offset += cls.ROW.size
+            rows.append(EventRow(event_id.hex(), lt, raw[offset:offset + size].decode()))
+            offset += size
+        return rows
+
+    async def fetch(
+            self,
+            tonapi: TonapiClient,
+            user_id: int,
+            account_id: str,
+            cursor: int = 0,
+            refresh: bool = False,
+    ) -> list[EventRow]:
+        """
+        Get a page of events from the store, fetching and storing it on a miss.
+
+        :param tonapi: The client to make requests with.
+        :param user_id: The user the page is shown to.
+        :param account_id: The account the events belong to.
+        :param cursor: The ``before_lt`` of the page, 0 for the first page.
+        :param refresh: Fetch the page even if it is stored.
+        :return: The rows of the page.
+        """
+        key = self.key(tonapi.testnet, user_id, account_id, cursor)
+        raw = None
+        if not refresh:
+            try:
+                raw = await self.redis.get(key)
+            except RedisError as e:
+                logging.warning(f"Page store read failed: {e}")
+
+        if raw is not None:
+            self.hits += 1
+            return self.decode(raw)
+
+        self.misses += 1
+        params = {"before_lt": cursor} if cursor else {}
+        events = await tonapi.accounts.get_events(account_id=account_id, limit=self.page_size, **params)
+        rows = [EventRow(event.event_id, event.lt, create_event_button(event)) for event in events.events]
+
+        try:
+            await self.redis.set(key, self.encode(rows), ex=self.ttl)
+        except RedisError as e:
+            logging.warning(f"Page store write failed: {e}")
+        return rows
+
+    async def probe(
+            self,
+            tonapi: TonapiClient,
+            user_id: int,
+            account_id: str,
+            rows: list[EventRow],
+    ) -> int | None:
+        """
+        Get the cursor of the page following ``rows``, if that page holds any events.
+
+        The following page is fetched (and stored) to find out, so a history that is an
+        exact multiple of the page size does not end with an empty page.
+
+        :param tonapi: The client to make requests with.
+        :param user_id: The user the page is shown to.
+        :param account_id: The account the events belong to.
+        :param rows: The rows of the last known page.
+        :return: The ``before_lt`` of the following page, or None if there is none.
+        """
+        if len(rows) < self.page_size:
+            return None
+
+        cursor = rows[-1].lt
+        if not await self.fetch(tonapi, user_id, account_id, cursor):
+            return None
+        return cursor
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+        }
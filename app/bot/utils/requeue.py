@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from pytonapi.exceptions import TONAPITooManyRequestsError
+
+from .adaptive import CircuitBreaker
+from .scheduler import Priority
+
+
+@dataclass
+class DeferredLookup:
+    user_id: int
+    query: str
+    message_id: int | None
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class DeferredLookups:
+    """
+    Lookups that hit the shared key's rate limit, re-run once the budget frees.
+
+    Only the last lookup of every user is kept. Lookups are replayed in the order they
+    were deferred, while the circuit breaker allows interactive requests, and dropped
+    once older than ``max_age`` seconds.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, delay: float = 3.0, max_age: float = 300.0,
+                 max_size: int = 10_000) -> None:
+        self.breaker = breaker
+        self.delay = delay
+        self.max_age = max_age
+        self.max_size = max_size
+
+        self.deferred = 0
+        self.replayed = 0
+        self.expired = 0
+
+        self._pending: OrderedDict[int, DeferredLookup] = OrderedDict()
+
+    def defer(self, user_id: int, query: str, message_id: int | None) -> None:
+        self._pending[user_id] = DeferredLookup(user_id, query, message_id)
+        self._pending.move_to_end(user_id)
+        self.deferred += 1
+        while len(self._pending) > self.max_size:
+            self._pending.popitem(last=False)
+            self.expired += 1
+
+    def cancel(self, user_id: int) -> None:
+        self._pending.pop(user_id, None)
+
+    async def run(self, replay: Callable[[DeferredLookup], Awaitable[None]]) -> None:
+        """
+        Replay deferred lookups as the rate limit budget allows.
+
+        :param replay: Coroutine function re-running a lookup and editing in its result.
+        """
+        while True:
+            await asyncio.sleep(self.delay)
+            while self._pending:
+                await self.breaker.wait(Priority.INTERACTIVE)
+                user_id, lookup = self._pending.popitem(last=False)
+                if time.monotonic() - lookup.created_at > self.max_age:
+                    self.expired += 1
+                    continue
+                try:
+                    await replay(lookup)
+                    self.replayed += 1
+                except TONAPITooManyRequestsError:
+                    if user_id not in self._pending:
+                        self._pending[user_id] = lookup
+                        self._pending.move_to_end(user_id, last=False)
+                    break
+                except Exception as e:
+                    logging.exception(f"Deferred lookup failed: {e}")
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "deferred": self.deferred,
+            "replayed": self.replayed,
+            "expired": self.expired,
+        }
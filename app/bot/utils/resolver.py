@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+from pytonapi.schema.accounts import Account
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from .tonapi import TonapiClient
+
+ACCOUNT = "account"
+JETTON = "jetton"
+NFT = "nft"
+COLLECTION = "collection"
+
+
+@dataclass
+class Contract:
+    contract_type: str
+    account: Account
+    details: BaseModel | None = None
+
+
+class ContractResolver:
+    """
+    Resolves an address into its account and type-specific details.
+
+    The contract type of every resolved address is remembered (in process and in Redis).
+    When it is already known, the account and the details are fetched concurrently,
+    turning two serial round trips into one.
+    """
+
+    def __init__(self, redis: Redis | None = None, max_size: int = 100_000, ttl: int = 7 * 24 * 60 * 60) -> None:
+        self.redis = redis
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.speculative = 0
+        self.mispredicted = 0
+        self.serial = 0
+
+        self._types: OrderedDict[str, str] = OrderedDict()
+
+    @staticmethod
+    def classify(account: Account) -> str:
+        interfaces = account.interfaces or []
+        if "tep74" in interfaces:
+            return JETTON
+        if "tep62_item" in interfaces:
+            return NFT
+        if "tep62_collection" in interfaces:
+            return COLLECTION
+        return ACCOUNT
+
+    @staticmethod
+    async def fetch_details(tonapi: TonapiClient, contract_type: str, account_id: str) -> BaseModel | None:
+        match contract_type:
+            case "jetton":
+                return await tonapi.jettons.get_info(account_id)
+            case "nft":
+                return await tonapi.nft.get_item_by_address(account_id)
+            case "collection":
+                return await tonapi.nft.get_collection_by_collection_address(account_id)
+        return None
+
+    @staticmethod
+    def _key(testnet: bool, account_id: str) -> str:
+        return f"contract_type:{'testnet' if testnet else 'mainnet'}:{account_id}"
+
+    async def get_type(self, testnet: bool, account_id: str) -> str | None:
+        key = self._key(testnet, account_id)
+        if key in self._types:
+            self._types.move_to_end(key)
+            return self._types[key]
+        if self.redis:
+            try:
+                contract_type = await self.redis.get(key)
+            except RedisError as e:
+                logging.warning(f"Contract type lookup failed: {e}")
+                return None
+            if contract_type:
+                self._remember(key, contract_type.decode())
+                return self._types[key]
+        return None
+
+    def _remember(self, key: str, contract_type: str) -> None:
+        self._types[key] = contract_type
+        self._types.move_to_end(key)
+        while len(self._types) > self.max_size:
+            self._types.popitem(last=False)
+
+    async def set_type(self, testnet: bool, account_id: str, contract_type: str) -> None:
+        key = self._key(testnet, account_id)
+        if self._types.get(key) == contract_type:
+            return
+        self._remember(key, contract_type)
+        if self.redis:
+            try:
+                await self.redis.set(key, contract_type, ex=self.ttl)
+            except RedisError as e:
+                logging.warning(f"Contract type store failed: {e}")
+
+    async def resolve(self, tonapi: TonapiClient, account_id: str) -> Contract:
+        """
+        Resolve an address into its account and type-specific details.
+
+        :param tonapi: The client to make requests with.
+        :param account_id: The address to resolve.
+        :return: The resolved :class:`Contract`.
+        """
+        known_type = await self.get_type(tonapi.testnet, account_id)
+
+        if known_type and known_type != ACCOUNT:
+            self.speculative += 1
+            account, details = await asyncio.gather(
+                tonapi.accounts.get_info(account_id),
+                self.fetch_details(tonapi, known_type, account_id),
+                return_exceptions=True,
+            )
+            if isinstance(account, BaseException):
+                raise account
+            contract_type = self.classify(account)
+            if contract_type != known_type:
+                self.mispredicted += 1
+                details = await self.fetch_details(tonapi, contract_type, account_id)
+            elif isinstance(details, BaseException):
+                raise details
+        else:
+            self.serial += 1
+            account = await tonapi.accounts.get_info(account_id)
+            contract_type = self.classify(account)
+            details = await self.fetch_details(tonapi, contract_type, account_id)
+
+        await self.set_type(tonapi.testnet, account_id, contract_type)
+        return Contract(contract_type, account, details)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "known": len(self._types),
+            "speculative": self.speculative,
+            "mispredicted": self.mispredicted,
+            "serial": self.serial,
+        }
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+
+
+class TokenBucket:
+    """
+    Classic token bucket: ``rate`` tokens per second, at most ``capacity`` stored.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """
+        Take one token, going into debt if the bucket is empty.
+
+        :return: The number of seconds to wait before the token may be used.
+        """
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class FairScheduler:
+    """
+    Admits requests at the rate of a token bucket.
+
+    Waiting requests are split into priority lanes served by weighted round robin,
+    so neither lane can starve the other. Within a lane every user gets one request
+    per turn, so a single heavy user cannot monopolize the budget.
+    """
+    LANE_WEIGHTS = {Priority.INTERACTIVE: 4, Priority.BULK: 1}
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.bucket = TokenBucket(rate, burst)
+
+        self.granted = 0
+        self.waiting = 0
+
+        self._lanes: dict[Priority, OrderedDict[int, deque[asyncio.Future]]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._credits = dict(self.LANE_WEIGHTS)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def acquire(self, user_id: int, priority: Priority = Priority.INTERACTIVE) -> None:
+        """
+        Wait until the user's request may be sent upstream.
+
+        :param user_id: The user the request is made for.
+        :param priority: The lane of the request.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].setdefault(user_id, deque()).append(future)
+        self.waiting += 1
+        self._wakeup.set()
+        await future
+
+    def _next_lane(self) -> Priority | None:
+        ready = [priority for priority in Priority if self._lanes[priority]]
+        if not ready:
+            return None
+        if all(self._credits[priority] <= 0 for priority in ready):
+            self._credits = dict(self.LANE_WEIGHTS)
+        for priority in ready:
+            if self._credits[priority] > 0:
+                self._credits[priority] -= 1
+                return priority
+        return ready[0]
+
+    def _pop(self, priority: Priority) -> asyncio.Future | None:
+        lane = self._lanes[priority]
+        user_id, queue = next(iter(lane.items()))
+        future = queue.popleft()
+        self.waiting -= 1
+        if queue:
+            lane.move_to_end(user_id)
+        else:
+            del lane[user_id]
+        return None if future.done() else future
+
+    async def _dispatch(self) -> None:
+        while True:
+            priority = self._next_lane()
+            if priority is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            future = self._pop(priority)
+            if future is None:
+                continue
+
+            delay = self.bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            if not future.done():
+                future.set_result(None)
+                self.granted += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "granted": self.granted,
+            "waiting": self.waiting,
+            "tokens": round(self.bucket.tokens, 2),
+        }
+
+
+class TonapiScheduler(FairScheduler):
+    """
+    Scheduler for requests made through the shared TONAPI key.
+
+    The bucket is sized to the plan; bulk export pages go to the bulk lane,
+    so they cannot starve interactive lookups and vice versa.
+    """
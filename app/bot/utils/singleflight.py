@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+# Result given to the callers that joined a call whose caller was cancelled.
+_RETRY = object()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in flight,
+    later callers with the same key await its result instead of running their own.
+
+    If the caller running the call is cancelled, the callers that joined it are not:
+    one of them runs the call again and the others join that one.
+    """
+
+    def __init__(self) -> None:
+        self.executed = 0
+        self.shared = 0
+
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[any]]) -> any:
+        """
+        Run ``call`` for the key, or join the call already in flight for it.
+
+        :param key: Identity of the call.
+        :param call: Coroutine factory performing the work.
+        :return: The result shared by all callers of the key.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            result = await asyncio.shield(future)
+            if result is _RETRY:
+                return await self.do(key, call)
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.exception())
+        self._calls[key] = future
+        self.executed += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.set_result(_RETRY)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "shared": self.shared,
+            "in_flight": self.in_flight,
+        }
@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import typing
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from aiogram.contrib.fsm_storage.redis import RedisStorage2, STATE_KEY, STATE_DATA_KEY
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, WatchError
+
+from .codec import StateCodec
+
+_MISSING = object()
+
+
+@dataclass
+class _Entry:
+    state: typing.Any = _MISSING
+    data: typing.Any = _MISSING
+    # The data as read from Redis, to tell which fields the update changed.
+    loaded: typing.Any = _MISSING
+    dirty_state: bool = False
+    dirty_data: bool = False
+
+
+@dataclass
+class StateBuffer:
+    """
+    FSM state and data of the users touched by one update.
+    """
+    entries: dict[tuple[str, str], _Entry] = field(default_factory=dict)
+
+    def entry(self, chat: str, user: str) -> _Entry:
+        return self.entries.setdefault((chat, user), _Entry())
+
+
+_buffer: ContextVar[StateBuffer | None] = ContextVar("state_buffer", default=None)
+
+
+class BufferedRedisStorage(RedisStorage2):
+    """
+    :class:`RedisStorage2` that memoizes FSM state and data for the duration of an update.
+
+    While a buffer is active (see :meth:`begin`), the state and data of every user are read
+    from Redis at most once, writes only update the in-memory copy, and :meth:`flush`
+    writes all changes in one pipelined round trip. Outside an update every call goes
+    to Redis, as with :class:`RedisStorage2`. Only the fields an update changed are
+    written back, merged under WATCH into what is stored by then, so writes made
+    meanwhile by other updates, workers or replicas are kept.
+
+    FSM data is stored with a binary :class:`StateCodec`; values written as plain JSON
+    are still read and are re-encoded on their next write (or by :meth:`compact`).
+
+    The long-lived fields of a user (:attr:`SESSION_FIELDS`) are kept under a separate
+    ``session`` key with their own idle TTL, so the disposable view data can expire
+    much sooner without logging the user out of their API key or network.
+    Both TTLs slide on every read.
+    """
+    SESSION_KEY = "session"
+    SESSION_FIELDS = ("tonapi_key", "testnet", "message_id")
+    # Fields of older releases that are no longer read.
+    OBSOLETE_FIELDS = ("events", "total_pages")
+    # Attempts to merge the changes of a buffer before they are written unwatched.
+    COMMIT_ATTEMPTS = 5
+
+    def __init__(
+            self,
+            host: str = "localhost",
+            port: int = 6379,
+            db: int | None = None,
+            password: str | None = None,
+            ssl: bool | None = None,
+            pool_size: int = 10,
+            codec: StateCodec | None = None,
+            session_ttl: int | None = None,
+            **kwargs,
+    ) -> None:
+        super().__init__(host=host, port=port, db=db, password=password, ssl=ssl, pool_size=pool_size, **kwargs)
+        for option in ("prefix", "state_ttl", "data_ttl", "bucket_ttl", "loop"):
+            kwargs.pop(option, None)
+        # Binary values, so responses are not decoded.
+        self._redis = Redis(host=host, port=port, db=db, password=password, ssl=ssl,
+                            max_connections=pool_size, decode_responses=False, **kwargs)
+        self.codec = codec or StateCodec()
+        self._session_ttl = session_ttl
+
+        self.reads = 0
+        self.reads_saved = 0
+        self.writes = 0
+        self.writes_saved = 0
+
+    @staticmethod
+    def begin() -> StateBuffer:
+        buffer = StateBuffer()
+        _buffer.set(buffer)
+        return buffer
+
+    @staticmethod
+    def buffered() -> bool:
+        """
+        Whether a buffer is active in the current context.
+        """
+        return _buffer.get() is not None
+
+    async def commit(self) -> None:
+        """
+        Write the changes of the active buffer, keeping it active.
+        """
+        buffer = _buffer.get()
+        if buffer is None:
+            return
+
+        dirty = [(key, entry) for key, entry in buffer.entries.items() if entry.dirty_state or entry.dirty_data]
+        if not dirty:
+            return
+
+        # Data that was read is merged into the stored data; data that was only set replaces it.
+        merged = [key for key, entry in dirty if entry.dirty_data and entry.loaded is not _MISSING]
+        watched = [self.generate_key(chat, user, suffix)
+                   for chat, user in merged for suffix in (STATE_DATA_KEY, self.SESSION_KEY)]
+
+        for attempt in range(1, self.COMMIT_ATTEMPTS + 1):
+            async with self._redis.pipeline(transaction=True) as pipe:
+                try:
+                    stored = {}
+                    if watched:
+                        unwatched = attempt == self.COMMIT_ATTEMPTS
+                        if unwatched:
+                            logging.warning(f"FSM data kept changing, writing it unwatched: {merged}")
+                        else:
+                            await pipe.watch(*watched)
+                        raw = await (self._redis if unwatched else pipe).mget(watched)
+                        stored = {key: self._decode_data(*raw[i * 2:i * 2 + 2]) for i, key in enumerate(merged)}
+                        pipe.multi()
+
+                    written = {}
+                    for (chat, user), entry in dirty:
+                        if entry.dirty_state:
+                            key = self.generate_key(chat, user, STATE_KEY)
+                            if entry.state is None:
+                                pipe.delete(key)
+                            else:
+                                pipe.set(key, entry.state, ex=self._state_ttl)
+                        if entry.dirty_data:
+                            data = entry.data
+                            if (chat, user) in stored:
+                                data = self._merge(stored[(chat, user)], entry.loaded, entry.data)
+                            self._write_data(pipe, chat, user, data)
+                            written[(chat, user)] = data
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    continue
+
+        for key, entry in dirty:
+            if key in written:
+                entry.data = written[key]
+                entry.loaded = copy.deepcopy(written[key])
+            entry.dirty_state = entry.dirty_data = False
+        self.writes += 1
+        self.writes_saved -= 1
+
+    @staticmethod
+    def _merge(stored: dict, loaded: dict, data: dict) -> dict:
+        """
+        Apply the changes from ``loaded`` to ``data`` onto ``stored``.
+        """
+        merged = dict(stored)
+        for key in loaded.keys() - data.keys():
+            merged.pop(key, None)
+        for key, value in data.items():
+            if key not in loaded or loaded[key] != value:
+                merged[key] = value
+        return merged
+
+    async def flush(self) -> None:
+        """
+        Write the changes of the active buffer and deactivate it.
+        """
+        try:
+            await self.commit()
+        finally:
+            _buffer.set(None)
+
+    def _split(self, data: dict) -> tuple[dict, dict]:
+        session = {k: v for k, v in data.items() if k in self.SESSION_FIELDS}
+        view = {k: v for k, v in data.items() if k not in self.SESSION_FIELDS and k not in self.OBSOLETE_FIELDS}
+        return session, view
+
+    def _write_data(self, pipe, chat, user, data: dict) -> None:
+        session, view = self._split(data or {})
+        for suffix, value, ttl in ((self.SESSION_KEY, session, self._session_ttl),
+                                   (STATE_DATA_KEY, view, self._data_ttl)):
+            key = self.generate_key(chat, user, suffix)
+            if value:
+                pipe.set(key, self.codec.encode(value), ex=ttl)
+            else:
+                pipe.delete(key)
+
+    async def _load_state(self, chat, user) -> str | None:
+        chat, user = self.check_address(chat=chat, user=user)
+        raw = await self._redis.getex(self.generate_key(chat, user, STATE_KEY), ex=self._state_ttl)
+        return raw.decode() if raw else None
+
+    async def _load_data(self, chat, user) -> dict:
+        chat, user = self.check_address(chat=chat, user=user)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.getex(self.generate_key(chat, user, STATE_DATA_KEY), ex=self._data_ttl)
+            pipe.getex(self.generate_key(chat, user, self.SESSION_KEY), ex=self._session_ttl)
+            view, session = await pipe.execute()
+        return self._decode_data(view, session)
+
+    def _decode_data(self, view: bytes | None, session: bytes | None) -> dict:
+        # Data written before the split still holds the session fields.
+        data = self.codec.decode(view) if view else {}
+        if session:
+            data.update(self.codec.decode(session))
+        return data
+
+    async def get_states_list(self) -> typing.List[typing.Tuple[str, str]]:
+        keys = await self._redis.keys(self.generate_key("*", "*", STATE_KEY))
+        return [tuple(key.decode().split(":")[-3:-1]) for key in keys]
+
+    async def compact(self, batch: int = 500) -> dict[str, int]:
+        """
+        Bring the stored FSM keys in line with the current layout.
+
+        Data stored as plain JSON, still holding the session fields or obsolete fields,
+        or stored without a TTL is rewritten; state and bucket keys without a TTL get one.
+        A key that is written by an update during the sweep is left to that update.
+
+        :param batch: The number of keys scanned per round trip.
+        :return: The number of rewritten and expired keys.
+        """
+        result = {"scanned": 0, "rewritten": 0, "expired": 0}
+
+        async for key in self._redis.scan_iter(match=self.generate_key("*", "*", STATE_DATA_KEY), count=batch):
+            result["scanned"] += 1
+            chat, user = key.decode().split(":")[-3:-1]
+            session_key = self.generate_key(chat, user, self.SESSION_KEY)
+            async with self._redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(key, session_key)
+                    raw, ttl = await pipe.get(key), await pipe.ttl(key)
+                    if not raw:
+                        continue
+                    stored = self.codec.decode(raw)
+                    if not (StateCodec.is_legacy(raw) or ttl == -1 and self._data_ttl
+                            or any(k in stored for k in self.SESSION_FIELDS + self.OBSOLETE_FIELDS)):
+                        continue
+                    session = await pipe.get(session_key)
+                    if session:
+                        stored.update(self.codec.decode(session))
+                    pipe.multi()
+                    self._write_data(pipe, chat, user, stored)
+                    await pipe.execute()
+                    result["rewritten"] += 1
+                except WatchError:
+                    pass
+
+        for suffix, ttl in ((STATE_KEY, self._state_ttl), ("bucket", self._bucket_ttl),
+                            (self.SESSION_KEY, self._session_ttl)):
+            if not ttl:
+                continue
+            async for key in self._redis.scan_iter(match=self.generate_key("*", "*", suffix), count=batch):
+                result["scanned"] += 1
+                # NX: only keys that have no TTL yet.
+                if await self._redis.expire(key, ttl, nx=True):
+                    result["expired"] += 1
+        return result
+
+    async def run_compaction(self, interval: int = 6 * 60 * 60) -> None:
+        """
+        Run :meth:`compact` every ``interval`` seconds, until cancelled.
+        """
+        while True:
+            try:
+                logging.info(f"FSM compaction: {await self.compact()}")
+            except RedisError as e:
+                logging.warning(f"FSM compaction failed: {e}")
+            await asyncio.sleep(interval)
+
+    def _entry(self, chat, user) -> _Entry | None:
+        buffer = _buffer.get()
+        if buffer is None:
+            return None
+        chat, user = self.check_address(chat=chat, user=user)
+        return buffer.entry(str(chat), str(user))
+
+    async def get_state(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                        default: typing.Optional[str] = None) -> typing.Optional[str]:
+        entry = self._entry(chat, user)
+        if entry is None:
+            self.reads += 1
+            return await self._load_state(chat, user) or self.resolve_state(default)
+
+        if entry.state is _MISSING:
+            self.reads += 1
+            entry.state = await self._load_state(chat, user)
+        else:
+            self.reads_saved += 1
+        return entry.state or self.resolve_state(default)
+
+    async def get_data(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                       default: typing.Optional[dict] = None) -> typing.Dict:
+        entry = self._entry(chat, user)
+        if entry is None:
+            self.reads += 1
+            return await self._load_data(chat, user) or default or {}
+
+        if entry.data is _MISSING:
+            self.reads += 1
+            entry.data = await self._load_data(chat, user)
+            entry.loaded = copy.deepcopy(entry.data)
+        else:
+            self.reads_saved += 1
+        return copy.deepcopy(entry.data) or default or {}
+
+    async def set_state(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                        state: typing.Optional[typing.AnyStr] = None):
+        entry = self._entry(chat, user)
+        if entry is None:
+            self.writes += 1
+            return await super().set_state(chat=chat, user=user, state=state)
+
+        self.writes_saved += 1
+        entry.state = None if state is None else self.resolve_state(state)
+        entry.dirty_state = True
+
+    async def set_data(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                       data: typing.Dict = None):
+        entry = self._entry(chat, user)
+        if entry is None:
+            self.writes += 1
+            chat, user = self.check_address(chat=chat, user=user)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                self._write_data(pipe, chat, user, data)
+                await pipe.execute()
+            return
+
+        self.writes_saved += 1
+        entry.data = copy.deepcopy(data) or {}
+        entry.dirty_data = True
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "reads": self.reads,
+            "reads_saved": self.reads_saved,
+            "writes": self.writes,
+            "writes_saved": self.writes_saved,
+        }
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from functools import partial
+
+import aiohttp
+from pytonapi import AsyncTonapi
+from pytonapi.async_tonapi.client import AsyncTonapiClient
+from pytonapi.exceptions import TONAPITooManyRequestsError
+
+from .adaptive import AIMDLimiter, CircuitBreaker
+from .cache import ResponseCache
+from .crypto import decrypt_key
+from .scheduler import Priority, TonapiScheduler
+from .singleflight import SingleFlight
+
+
+class TonapiTransport:
+    """
+    Sends the requests of pooled clients through one long-lived HTTP session,
+    to ``base_url`` if set.
+
+    pytonapi hardcodes the TONAPI URL in a private attribute of every method group
+    and opens a new session for every request, so the groups handed out by
+    :class:`PooledTonapi` get their ``_get`` and ``_post`` replaced by the transport's,
+    and all clients share its connections (at most ``limit`` at once).
+    """
+    URLS = {False: "https://tonapi.io/", True: "https://testnet.tonapi.io/"}
+
+    def __init__(self, base_url: str | None = None, limit: int = 100) -> None:
+        self.base_url = base_url.rstrip("/") + "/" if base_url else None
+        self.limit = limit
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, ssl=False),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session:
+            await self._session.close()
+
+    def url(self, testnet: bool, method: str) -> str:
+        return f"{self.base_url or self.URLS[testnet]}{method}"
+
+    async def request(
+            self,
+            group: AsyncTonapiClient,
+            http_method: str,
+            method: str,
+            headers: dict | None = None,
+            **kwargs,
+    ) -> any:
+        """
+        Send a request of a method group, retrying rate-limited answers like pytonapi.
+
+        :param group: The method group making the request.
+        :param http_method: GET or POST.
+        :param method: The API method, e.g. ``v2/accounts/{id}``.
+        :param headers: Extra headers of the request.
+        :return: The decoded response.
+        """
+        headers = {**(headers or {}), "Authorization": f"Bearer {group._api_key}"}
+        url = self.url(group._testnet, method)
+        # pytonapi maps the status codes to its exceptions.
+        process = AsyncTonapiClient._AsyncTonapiClient__process_response
+
+        for attempt in range(1, group._max_retries + 1):
+            try:
+                async with self.session.request(http_method, url, headers=headers, **kwargs) as response:
+                    return await process(response)
+            except TONAPITooManyRequestsError:
+                logging.warning(f"Rate limit exceeded. Retrying {attempt}/{group._max_retries} is in progress.")
+                await asyncio.sleep(1)
+        raise TONAPITooManyRequestsError
+
+    def bind(self, group: AsyncTonapiClient) -> AsyncTonapiClient:
+        async def get(method: str, params: dict | None = None, headers: dict | None = None) -> any:
+            return await self.request(group, "GET", method, headers, params=params or {})
+
+        async def post(method: str, body: dict | None = None, headers: dict | None = None) -> any:
+            return await self.request(group, "POST", method, headers, json=body or {})
+
+        group._get, group._post = get, post
+        return group
+
+
+class PooledTonapi(AsyncTonapi):
+    """
+    :class:`AsyncTonapi` whose method groups send their requests through a :class:`TonapiTransport`.
+    """
+    GROUPS = frozenset(name for name, value in vars(AsyncTonapi).items() if isinstance(value, property))
+
+    def __init__(self, api_key: str, testnet: bool, max_retries: int, transport: TonapiTransport) -> None:
+        super().__init__(api_key, testnet, max_retries)
+        self.transport = transport
+
+    def __getattribute__(self, name: str) -> any:
+        value = super().__getattribute__(name)
+        if name in PooledTonapi.GROUPS:
+            return self.transport.bind(value)
+        return value
+
+
+class TonapiPool:
+    """
+    Bounded LRU pool of long-lived :class:`PooledTonapi` clients, which share
+    the HTTP connections of one :class:`TonapiTransport`.
+
+    Clients are keyed by (API key fingerprint, testnet) so the raw key never
+    becomes a dictionary key. Decrypted user keys are memoized for ``key_ttl``
+    seconds to keep Fernet off the per-update path.
+    """
+
+    def __init__(
+            self,
+            encryption_key: str,
+            max_size: int = 1024,
+            idle_ttl: float = 600.0,
+            key_ttl: float = 300.0,
+            max_retries: int = 10,
+            base_url: str | None = None,
+            max_connections: int = 100,
+    ) -> None:
+        self.encryption_key = encryption_key
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.key_ttl = key_ttl
+        self.max_retries = max_retries
+        self.transport = TonapiTransport(base_url, max_connections)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._clients: OrderedDict[tuple[str, bool], tuple[PooledTonapi, float]] = OrderedDict()
+        self._keys: dict[str, tuple[str, float]] = {}
+
+    @staticmethod
+    def fingerprint(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    def decrypt(self, encrypted_key: str) -> str:
+        """
+        Decrypt a user's API key, reusing the result while it is fresh.
+
+        :param encrypted_key: The Fernet token stored in the user's state.
+        :return: The decrypted API key.
+        :raises InvalidToken: If the token cannot be decrypted.
+        """
+        now = time.monotonic()
+        cached = self._keys.get(encrypted_key)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        api_key = decrypt_key(self.encryption_key, encrypted_key)
+        if len(self._keys) >= self.max_size:
+            self._keys = {k: v for k, v in self._keys.items() if v[1] > now}
+        self._keys[encrypted_key] = (api_key, now + self.key_ttl)
+        return api_key
+
+    def get(self, api_key: str, testnet: bool = False, max_retries: int | None = None) -> PooledTonapi:
+        """
+        Get a client for the given API key and network, creating it on a miss.
+
+        :param api_key: The plain API key.
+        :param testnet: Whether the client targets the testnet.
+        :param max_retries: Retries of rate-limited requests for a new client, the pool default if None.
+        :return: A pooled :class:`PooledTonapi` instance.
+        """
+        key = (self.fingerprint(api_key), testnet)
+        now = time.monotonic()
+
+        if key in self._clients:
+            self.hits += 1
+            tonapi, _ = self._clients[key]
+            self._clients[key] = (tonapi, now)
+            self._clients.move_to_end(key)
+            return tonapi
+
+        self.misses += 1
+        if max_retries is None:
+            max_retries = self.max_retries
+        tonapi = PooledTonapi(api_key, testnet, max_retries, self.transport)
+        self._clients[key] = (tonapi, now)
+        while len(self._clients) > self.max_size:
+            self._clients.popitem(last=False)
+            self.evictions += 1
+        return tonapi
+
+    def evict_idle(self) -> int:
+        """
+        Drop clients and decrypted keys that were not used recently.
+
+        :return: The number of evicted clients.
+        """
+        now = time.monotonic()
+        idle = [key for key, (_, last_used) in self._clients.items() if now - last_used > self.idle_ttl]
+        for key in idle:
+            del self._clients[key]
+        self._keys = {k: v for k, v in self._keys.items() if v[1] > now}
+        self.evictions += len(idle)
+        return len(idle)
+
+    async def run_eviction(self, seconds: int = 60) -> None:
+        """
+        Run idle eviction at regular intervals.
+
+        Args:
+            seconds (int): The number of seconds to wait between runs. Defaults to 60.
+        """
+        while True:
+            await asyncio.sleep(seconds)
+            self.evict_idle()
+
+    async def close(self) -> None:
+        """
+        Close the HTTP session shared by the clients.
+        """
+        await self.transport.close()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": len(self._clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "keys": len(self._keys),
+        }
+
+
+class TonapiClient:
+    """
+    Per-update view over a pooled :class:`AsyncTonapi` client.
+
+    Exposes the same ``tonapi.<group>.<method>(...)`` interface, but routes every call
+    through :meth:`request`: identical concurrent calls are coalesced, cacheable lookups
+    are served from the response cache, and requests made with the shared key wait for
+    the scheduler, pass the circuit breaker (bulk requests wait for it to allow them)
+    and run within the AIMD concurrency limit.
+    """
+
+    def __init__(
+            self,
+            tonapi: AsyncTonapi,
+            *,
+            user_id: int,
+            shared: bool,
+            testnet: bool = False,
+            scheduler: TonapiScheduler | None = None,
+            cache: ResponseCache | None = None,
+            singleflight: SingleFlight | None = None,
+            limiter: AIMDLimiter | None = None,
+            breaker: CircuitBreaker | None = None,
+            priority: Priority = Priority.INTERACTIVE,
+    ) -> None:
+        self.tonapi = tonapi
+        self.user_id = user_id
+        self.shared = shared
+        self.testnet = testnet
+        self.scheduler = scheduler
+        self.cache = cache
+        self.singleflight = singleflight
+        self.limiter = limiter
+        self.breaker = breaker
+        self.priority = priority
+
+    def __getattr__(self, group: str) -> _MethodGroup:
+        return _MethodGroup(self, group)
+
+    def bulk(self) -> TonapiClient:
+        """
+        Get a copy of the client whose requests go through the bulk lane.
+        """
+        return TonapiClient(
+            self.tonapi,
+            user_id=self.user_id, shared=self.shared, testnet=self.testnet,
+            scheduler=self.scheduler, cache=self.cache,
+            singleflight=self.singleflight, limiter=self.limiter,
+            breaker=self.breaker, priority=Priority.BULK,
+        )
+
+    async def request(self, group: str, method: str, *args, **kwargs) -> any:
+        """
+        Call ``tonapi.<group>.<method>(*args, **kwargs)`` through the request pipeline.
+        """
+        call = partial(self._call, group, method, *args, **kwargs)
+        if self.cache:
+            call = partial(self.cache.fetch, f"{group}.{method}", self.testnet, call, *args, **kwargs)
+        if self.singleflight:
+            return await self.singleflight.do(self._flight_key(group, method, args, kwargs), call)
+        return await call()
+
+    def _flight_key(self, group: str, method: str, args: tuple, kwargs: dict) -> str:
+        # Calls made with different personal keys are never merged,
+        # so one user's invalid key cannot fail another user's request.
+        owner = "shared" if self.shared else id(self.tonapi)
+        params = json.dumps([args, sorted(kwargs.items())], default=str, separators=(",", ":"))
+        return f"{owner}:{self.testnet}:{group}.{method}:{params}"
+
+    async def _call(self, group: str, method: str, *args, **kwargs) -> any:
+        func = getattr(getattr(self.tonapi, group), method)
+        if not self.shared:
+            return await func(*args, **kwargs)
+
+        if self.scheduler:
+            await self.scheduler.acquire(self.user_id, self.priority)
+        # Checked once the request is due, as the circuit may change while it waits.
+        if self.breaker:
+            if self.priority == Priority.BULK:
+                # A long export waits out a strained circuit instead of losing its progress.
+                await self.breaker.wait(self.priority)
+            else:
+                self.breaker.check(self.priority)
+        if self.limiter:
+            await self.limiter.acquire()
+
+        throttled = False
+        try:
+            return await func(*args, **kwargs)
+        except TONAPITooManyRequestsError:
+            throttled = True
+            if self.breaker:
+                self.breaker.record_failure()
+            raise
+        finally:
+            if self.limiter:
+                await self.limiter.release(throttled)
+
+
+class _MethodGroup:
+
+    def __init__(self, client: TonapiClient, group: str) -> None:
+        self.client = client
+        self.group = group
+
+    def __getattr__(self, method: str) -> partial:
+        return partial(self.client.request, self.group, method)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+from typing import Awaitable, Callable
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.webhook import WebhookRequestHandler, BOT_DISPATCHER_KEY
+from aiogram.types import AllowedUpdates, Update
+from aiohttp import web
+
+from ..config import WebhookConfig
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class UpdateIntake:
+    """
+    Updates accepted from the webhook and processed in the background, at most ``limit`` at once.
+
+    Above the limit updates are refused with 503, and Telegram delivers them again later,
+    possibly to another worker or replica.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._tasks: set[asyncio.Task] = set()
+
+        self.accepted = 0
+        self.rejected = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self._tasks) >= self.limit
+
+    def submit(self, dispatcher: Dispatcher, update: Update) -> None:
+        self.accepted += 1
+        task = asyncio.create_task(dispatcher.updates_handler.notify(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self, timeout: float = 30) -> None:
+        """
+        Wait for the updates in flight to be processed.
+        """
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._tasks),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+        }
+
+
+class WebhookHandler(WebhookRequestHandler):
+    """
+    Webhook endpoint that checks the secret token, answers right away
+    and hands the update to the :class:`UpdateIntake`.
+    """
+
+    async def post(self) -> web.Response:
+        secret: str | None = self.request.app["webhook_secret"]
+        if secret and not hmac.compare_digest(self.request.headers.get(SECRET_HEADER, ""), secret):
+            raise web.HTTPUnauthorized()
+
+        intake: UpdateIntake = self.request.app["intake"]
+        if intake.full:
+            intake.rejected += 1
+            return web.Response(status=503, headers={"Retry-After": "1"})
+
+        dispatcher = self.get_dispatcher()
+        update = await self.parse_update(dispatcher.bot)
+        intake.submit(dispatcher, update)
+        return web.Response(text="ok")
+
+
+def create_app(
+        dp: Dispatcher,
+        config: WebhookConfig,
+        on_startup: Callable[[Dispatcher], Awaitable[None]],
+        on_shutdown: Callable[[Dispatcher], Awaitable[None]],
+        primary: bool = True,
+) -> web.Application:
+    """
+    Create the web application serving the webhook of one worker.
+
+    :param dp: The Dispatcher of the worker.
+    :param config: The webhook configuration.
+    :param on_startup: Called with the Dispatcher when the server starts.
+    :param on_shutdown: Called with the Dispatcher when the server stops.
+    :param primary: Whether this worker registers the webhook with Telegram.
+    :return: The :class:`web.Application`.
+    """
+    app = web.Application()
+    app[BOT_DISPATCHER_KEY] = dp
+    app["webhook_secret"] = config.SECRET
+    app["intake"] = intake = UpdateIntake(config.MAX_UPDATES)
+    app.router.add_route("*", config.PATH, WebhookHandler)
+
+    async def startup(_: web.Application) -> None:
+        await on_startup(dp)
+        if primary:
+            await dp.bot.set_webhook(
+                url=config.URL,
+                secret_token=config.SECRET,
+                max_connections=config.MAX_CONNECTIONS,
+                allowed_updates=AllowedUpdates.all(),
+            )
+            logging.info(f"Webhook set to {config.URL}")
+
+    async def shutdown(_: web.Application) -> None:
+        await intake.close()
+        logging.info(f"Webhook intake stats: {intake.stats}")
+        await on_shutdown(dp)
+
+    app.on_startup.append(startup)
+    app.on_shutdown.append(shutdown)
+    return app
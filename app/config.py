@@ -12,6 +12,9 @@ BASE_DIR = Path(__file__).resolve().parent
 class BotConfig:
     TOKEN: str
     DEV_ID: int
+    RPS: float
+    CHAT_RPS: float
+    SHARDS: int
 
 
 @dataclass
@@ -19,6 +22,13 @@ class RedisConfig:
     HOST: str
     PORT: int
     DB: int
+    FSM_CODEC: str
+    FSM_ZLIB_THRESHOLD: int
+    FSM_SESSION_TTL: int
+    FSM_DATA_TTL: int
+    FSM_STATE_TTL: int
+    FSM_BUCKET_TTL: int
+    FSM_COMPACTION_INTERVAL: int
 
 
 @dataclass
@@ -34,6 +44,23 @@ class DatabaseConfig:
 class TonapiConfig:
     KEY: str
     ENCRYPTION_KEY: str
+    RPS: float
+    BURST: int
+    BASE_URL: str | None
+    DNS_TTL: int
+
+
+@dataclass
+class WebhookConfig:
+    ENABLED: bool
+    URL: str | None
+    PATH: str
+    HOST: str
+    PORT: int
+    SECRET: str | None
+    WORKERS: int
+    MAX_CONNECTIONS: int
+    MAX_UPDATES: int
 
 
 @dataclass
@@ -42,6 +69,16 @@ class Config:
     redis: RedisConfig
     db: DatabaseConfig
     tonapi: TonapiConfig
+    webhook: WebhookConfig
+
+    @property
+    def processes(self) -> int:
+        """
+        The number of processes of a replica that share its rate budgets.
+        """
+        if self.bot.SHARDS > 1:
+            return self.bot.SHARDS
+        return self.webhook.WORKERS if self.webhook.ENABLED else 1
 
 
 def load_config() -> Config:
@@ -52,11 +89,21 @@ def load_config() -> Config:
         bot=BotConfig(
             TOKEN=env.str("BOT_TOKEN"),
             DEV_ID=env.int("DEV_ID"),
+            RPS=env.float("BOT_RPS", 30),
+            CHAT_RPS=env.float("BOT_CHAT_RPS", 1),
+            SHARDS=env.int("BOT_SHARDS", 1),
         ),
         redis=RedisConfig(
             HOST=env.str("REDIS_HOST"),
             PORT=env.int("REDIS_PORT"),
             DB=env.int("REDIS_DB"),
+            FSM_CODEC=env.str("FSM_CODEC", "orjson"),
+            FSM_ZLIB_THRESHOLD=env.int("FSM_ZLIB_THRESHOLD", 1024),
+            FSM_SESSION_TTL=env.int("FSM_SESSION_TTL", 180 * 24 * 60 * 60),
+            FSM_DATA_TTL=env.int("FSM_DATA_TTL", 7 * 24 * 60 * 60),
+            FSM_STATE_TTL=env.int("FSM_STATE_TTL", 7 * 24 * 60 * 60),
+            FSM_BUCKET_TTL=env.int("FSM_BUCKET_TTL", 24 * 60 * 60),
+            FSM_COMPACTION_INTERVAL=env.int("FSM_COMPACTION_INTERVAL", 6 * 60 * 60),
         ),
         db=DatabaseConfig(
             HOST=env.str("DB_HOST"),
@@ -68,5 +115,20 @@ def load_config() -> Config:
         tonapi=TonapiConfig(
             KEY=env.str("TONAPI_KEY"),
             ENCRYPTION_KEY=env.str("ENCRYPTION_KEY"),
-        )
+            RPS=env.float("TONAPI_RPS", 10),
+            BURST=env.int("TONAPI_BURST", 10),
+            BASE_URL=env.str("TONAPI_BASE_URL", None),
+            DNS_TTL=env.int("TONAPI_DNS_TTL", 600),
+        ),
+        webhook=WebhookConfig(
+            ENABLED=env.bool("WEBHOOK", False),
+            URL=env.str("WEBHOOK_URL", None),
+            PATH=env.str("WEBHOOK_PATH", "/webhook"),
+            HOST=env.str("WEBHOOK_HOST", "0.0.0.0"),
+            PORT=env.int("WEBHOOK_PORT", 8080),
+            SECRET=env.str("WEBHOOK_SECRET", None),
+            WORKERS=env.int("WEBHOOK_WORKERS", 1),
+            MAX_CONNECTIONS=env.int("WEBHOOK_MAX_CONNECTIONS", 40),
+            MAX_UPDATES=env.int("WEBHOOK_MAX_UPDATES", 100),
+        ),
     )
@@ -0,0 +1,46 @@
+"""
+Local TONAPI stand-in for offline benchmarking.
+
+Record fixtures from the real API once:
+    python -m app.stub --record --api-key <KEY>
+
+Replay them with 50 ms latency and 1% of 429 responses:
+    python -m app.stub --latency 0.05 --error-rate 0.01 --error-status 429
+
+Then point the bot at it with TONAPI_BASE_URL=http://127.0.0.1:8081/
+"""
+import argparse
+from pathlib import Path
+
+from .server import StubConfig, run
+
+
+def init():
+    parser = argparse.ArgumentParser(prog="python -m app.stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fixtures", type=Path, default=StubConfig.fixtures)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency per request, seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency, seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error.")
+    parser.add_argument("--error-status", type=int, default=429, choices=[401, 429, 500])
+    parser.add_argument("--record", action="store_true", help="Forward to the upstream and record fixtures.")
+    parser.add_argument("--upstream", default=StubConfig.upstream)
+    parser.add_argument("--api-key", default=None)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        fixtures=args.fixtures,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        record=args.record,
+        upstream=args.upstream,
+        api_key=args.api_key,
+    )
+    run(config, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    init()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# (HTTP method, path pattern, fixture name) for the endpoints used by the bot.
+ROUTES: list[tuple[str, re.Pattern, str]] = [
+    (method, re.compile(pattern), name) for method, pattern, name in [
+        ("GET", r"^/v2/accounts/[^/]+$", "accounts_info"),
+        ("GET", r"^/v2/accounts/[^/]+/events$", "accounts_events"),
+        ("GET", r"^/v2/accounts/[^/]+/jettons$", "accounts_jettons"),
+        ("GET", r"^/v2/accounts/[^/]+/nfts$", "accounts_nfts"),
+        ("GET", r"^/v2/jettons/[^/]+$", "jettons_info"),
+        ("GET", r"^/v2/jettons/[^/]+/holders$", "jettons_holders"),
+        ("POST", r"^/v2/nfts/_bulk$", "nfts_bulk"),
+        ("GET", r"^/v2/nfts/collections/[^/]+$", "nfts_collection"),
+        ("GET", r"^/v2/nfts/collections/[^/]+/items$", "nfts_collection_items"),
+        ("GET", r"^/v2/nfts/[^/]+$", "nfts_item"),
+        ("GET", r"^/v2/dns/[^/]+/resolve$", "dns_resolve"),
+        ("GET", r"^/v2/events/[^/]+$", "events_event"),
+        ("GET", r"^/v2/rates$", "rates"),
+    ]
+]
+
+
+@dataclass
+class StubConfig:
+    fixtures: Path = BASE_DIR / "fixtures"
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 429
+    record: bool = False
+    upstream: str = "https://tonapi.io"
+    api_key: str | None = None
+
+
+class FixtureStore:
+    """
+    Recorded TONAPI responses on disk.
+
+    Every response is stored under its exact request (``exact/<digest>.json``) and,
+    the first time a route is seen, as the route's template (``<route>.json``), which
+    is served for any request to that route that was not recorded exactly.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        (self.path / "exact").mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def route(method: str, path: str) -> str | None:
+        for route_method, pattern, name in ROUTES:
+            if route_method == method and pattern.match(path):
+                return name
+        return None
+
+    @staticmethod
+    def digest(method: str, path: str, query: dict, body: bytes) -> str:
+        request = json.dumps([method, path, sorted(query.items()), body.decode()], separators=(",", ":"))
+        return hashlib.sha1(request.encode()).hexdigest()
+
+    def load(self, route: str | None, digest: str) -> tuple[int, dict] | None:
+        files = [self.path / "exact" / f"{digest}.json"]
+        if route:
+            files.append(self.path / f"{route}.json")
+        for file in files:
+            if file.exists():
+                fixture = json.loads(file.read_text())
+                return fixture["status"], fixture["body"]
+        return None
+
+    def save(self, route: str | None, digest: str, status: int, body: dict) -> None:
+        fixture = json.dumps({"status": status, "body": body}, ensure_ascii=False, indent=1)
+        (self.path / "exact" / f"{digest}.json").write_text(fixture)
+        template = self.path / f"{route}.json"
+        if route and status == 200 and not template.exists():
+            template.write_text(fixture)
+
+
+class TonapiStub:
+    """
+    Local stand-in for the TONAPI HTTP endpoints used by the bot,
+    with configurable latency and error injection.
+    """
+
+    def __init__(self, config: StubConfig) -> None:
+        self.config = config
+        self.store = FixtureStore(config.fixtures)
+        self.requests = 0
+        self.injected_errors = 0
+
+    async def _forward(self, request: web.Request, body: bytes) -> tuple[int, dict]:
+        headers = {"Authorization": f"Bearer {self.config.api_key}"} if self.config.api_key else {}
+        url = f"{self.config.upstream}{request.path}"
+        async with aiohttp.ClientSession(headers=headers) as session:
+            async with session.request(request.method, url, params=request.query, data=body or None,
+                                       headers={"Content-Type": "application/json"} if body else None
+                                       ) as response:
+                return response.status, await response.json(content_type=None)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        body = await request.read()
+
+        if self.config.latency or self.config.jitter:
+            await asyncio.sleep(self.config.latency + random.uniform(0, self.config.jitter))
+
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            self.injected_errors += 1
+            return web.json_response({"error": "injected error"}, status=self.config.error_status)
+
+        route = self.store.route(request.method, request.path)
+        digest = self.store.digest(request.method, request.path, dict(request.query), body)
+
+        if self.config.record:
+            status, content = await self._forward(request, body)
+            self.store.save(route, digest, status, content)
+            return web.json_response(content, status=status)
+
+        fixture = self.store.load(route, digest)
+        if fixture is None:
+            return web.json_response({"error": f"no fixture for {request.method} {request.path}"}, status=404)
+        status, content = fixture
+        return web.json_response(content, status=status)
+
+    async def stats(self, _: web.Request) -> web.Response:
+        return web.json_response({"requests": self.requests, "injected_errors": self.injected_errors})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stub/stats", self.stats)
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        return app
+
+
+def run(config: StubConfig, host: str = "127.0.0.1", port: int = 8081) -> None:
+    logging.basicConfig(level=logging.INFO)
+    mode = f"recording from {config.upstream}" if config.record else f"replaying {config.fixtures}"
+    logging.info(f"TONAPI stub on http://{host}:{port}/, {mode}.")
+    web.run_app(TonapiStub(config).app(), host=host, port=port)
@@ -0,0 +1,65 @@
+"""
+The bot's TONAPI client against the local stand-in server.
+
+    python -m pytest tests
+"""
+import asyncio
+import json
+
+import pytest
+from aiohttp.test_utils import TestServer
+from pytonapi.exceptions import TONAPITooManyRequestsError
+
+from app.bot.utils.tonapi import TonapiClient, TonapiPool
+from app.stub.server import StubConfig, TonapiStub
+
+ACCOUNT_ID = "0:" + "ab" * 32
+ACCOUNT = {
+    "address": ACCOUNT_ID,
+    "balance": 1_500_000_000,
+    "last_activity": 1700000000,
+    "status": "active",
+    "name": "stub.ton",
+    "get_methods": [],
+}
+
+
+def run_against_stub(tmp_path, scenario, **config) -> TonapiStub:
+    (tmp_path / "accounts_info.json").write_text(json.dumps({"status": 200, "body": ACCOUNT}))
+    stub = TonapiStub(StubConfig(fixtures=tmp_path, **config))
+
+    async def main() -> None:
+        async with TestServer(stub.app()) as server:
+            pool = TonapiPool("", base_url=str(server.make_url("/")), max_retries=1)
+            tonapi = TonapiClient(pool.get("key"), user_id=1, shared=False)
+            try:
+                await scenario(tonapi)
+            finally:
+                await pool.close()
+
+    asyncio.run(main())
+    return stub
+
+
+def test_client_reaches_stub(tmp_path):
+    async def scenario(tonapi: TonapiClient) -> None:
+        account = await tonapi.accounts.get_info(account_id=ACCOUNT_ID)
+        assert account.name == "stub.ton"
+        assert account.status == "active"
+
+        # Later requests reuse the pooled connection.
+        session = tonapi.tonapi.transport.session
+        await tonapi.accounts.get_info(account_id=ACCOUNT_ID)
+        assert tonapi.tonapi.transport.session is session
+
+    stub = run_against_stub(tmp_path, scenario)
+    assert stub.requests == 2
+
+
+def test_injected_rate_limit_reaches_client(tmp_path):
+    async def scenario(tonapi: TonapiClient) -> None:
+        with pytest.raises(TONAPITooManyRequestsError):
+            await tonapi.accounts.get_info(account_id=ACCOUNT_ID)
+
+    stub = run_against_stub(tmp_path, scenario, error_rate=1.0, error_status=429)
+    assert stub.injected_errors == 1
@@ -0,0 +1,116 @@
+"""
+Simulated Telegram pushes against the webhook application.
+
+    python -m pytest tests
+"""
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.bot.webhook import SECRET_HEADER, create_app
+from app.config import WebhookConfig
+
+SECRET = "secret"
+
+
+class StubUpdatesHandler:
+    """
+    Records the updates the intake hands over, holding them until released.
+    """
+
+    def __init__(self) -> None:
+        self.updates = []
+        self.release = asyncio.Event()
+
+    async def notify(self, update) -> None:
+        self.updates.append(update)
+        await self.release.wait()
+
+
+def webhook_config(max_updates: int = 10) -> WebhookConfig:
+    return WebhookConfig(
+        ENABLED=True, URL=None, PATH="/webhook", HOST="127.0.0.1", PORT=0,
+        SECRET=SECRET, WORKERS=1, MAX_CONNECTIONS=40, MAX_UPDATES=max_updates,
+    )
+
+
+def telegram_update(update_id: int, user_id: int = 1) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {**user, "type": "private"},
+            "from": user,
+            "text": "/help",
+        },
+    }
+
+
+async def _noop(_: Dispatcher) -> None:
+    pass
+
+
+def run_push(max_updates: int, scenario) -> None:
+    async def main() -> None:
+        dp = Dispatcher(Bot(token="123456:TEST"))
+        dp.updates_handler = handler = StubUpdatesHandler()
+        app = create_app(dp, webhook_config(max_updates), _noop, _noop, primary=False)
+
+        async with TestClient(TestServer(app)) as client:
+            try:
+                await scenario(client, handler)
+            finally:
+                handler.release.set()
+        await (await dp.bot.get_session()).close()
+
+    asyncio.run(main())
+
+
+def test_rejects_bad_secret():
+    async def scenario(client: TestClient, handler: StubUpdatesHandler) -> None:
+        for headers in ({}, {SECRET_HEADER: "wrong"}):
+            response = await client.post("/webhook", json=telegram_update(1), headers=headers)
+            assert response.status == 401
+        assert client.app["intake"].accepted == 0
+        assert handler.updates == []
+
+    run_push(10, scenario)
+
+
+def test_accepted_update_reaches_updates_handler():
+    async def scenario(client: TestClient, handler: StubUpdatesHandler) -> None:
+        response = await client.post("/webhook", json=telegram_update(42), headers={SECRET_HEADER: SECRET})
+        assert response.status == 200
+        assert await response.text() == "ok"
+
+        await asyncio.sleep(0)
+        assert [update.update_id for update in handler.updates] == [42]
+        assert handler.updates[0].message.text == "/help"
+
+    run_push(10, scenario)
+
+
+def test_full_intake_answers_503():
+    async def scenario(client: TestClient, handler: StubUpdatesHandler) -> None:
+        headers = {SECRET_HEADER: SECRET}
+        for update_id in (1, 2):
+            response = await client.post("/webhook", json=telegram_update(update_id), headers=headers)
+            assert response.status == 200
+
+        response = await client.post("/webhook", json=telegram_update(3), headers=headers)
+        assert response.status == 503
+        assert response.headers["Retry-After"] == "1"
+
+        intake = client.app["intake"]
+        assert intake.stats == {"in_flight": 2, "accepted": 2, "rejected": 1}
+
+        # Once the updates in flight are done, pushes are accepted again.
+        handler.release.set()
+        await intake.close()
+        response = await client.post("/webhook", json=telegram_update(3), headers=headers)
+        assert response.status == 200
+
+    run_push(2, scenario)